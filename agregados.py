@@ -0,0 +1,50 @@
+import numpy as np
+import pandas as pd
+
+from dados import derivado
+
+# ==========================================
+# CUBO DIÁRIO DE AGREGADOS (PAINEL DO ADMIN)
+# ==========================================
+# Contagens por (dia, monitor, preceptor, função), montadas uma vez por versão dos dados.
+# Todos os filtros do painel são dimensões do cubo, então métricas e gráficos custam
+# O(tamanho do cubo) em vez de O(linhas) a cada interação.
+DIMENSOES = ['Data da atividade', 'Nome', 'Nome do preceptor', 'Função']
+HORAS_POR_REGISTRO = 4
+
+
+def _montar_cubo(df):
+    dims = [c for c in DIMENSOES if c in df.columns]
+    chaves = {c: df[c] for c in dims}
+    chaves['Data da atividade'] = df['Data da atividade'].dt.normalize()
+    # dropna=False: registros sem preceptor/função continuam contando no total
+    cubo = pd.DataFrame(chaves).groupby(dims, observed=True, dropna=False, sort=True).size().reset_index(name='N')
+    cubo['Horas'] = cubo['N'] * HORAS_POR_REGISTRO
+    return cubo
+
+
+def cubo(df):
+    return derivado(df, "cubo", _montar_cubo)
+
+
+def fatiar(cubo, nomes=None, preceptores=None, inicio=None, fim=None):
+    # Mesmos filtros da barra lateral (listas vazias = sem filtro); inicio/fim são datas inclusivas.
+    # O cubo já sai ordenado por dia: o período é uma fatia por busca binária.
+    datas = cubo['Data da atividade'].to_numpy()
+    a = np.searchsorted(datas, np.datetime64(inicio, 'D'), side="left") if inicio is not None else 0
+    b = np.searchsorted(datas, np.datetime64(fim, 'D'), side="right") if fim is not None else len(cubo)
+    fatia = cubo.iloc[a:b]
+    manter = np.ones(len(fatia), dtype=bool)
+    if nomes: manter &= fatia['Nome'].isin(nomes).to_numpy()
+    if preceptores and 'Nome do preceptor' in fatia.columns:
+        manter &= fatia['Nome do preceptor'].isin(preceptores).to_numpy()
+    return fatia if manter.all() else fatia[manter]
+
+
+def metricas(fatia):
+    return {
+        "registros": int(fatia['N'].sum()),
+        "monitores": fatia['Nome'].nunique(),
+        "horas": int(fatia['Horas'].sum()),
+        "preceptores": fatia['Nome do preceptor'].nunique() if 'Nome do preceptor' in fatia.columns else 0,
+    }
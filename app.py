@@ -1,11 +1,9 @@
 import streamlit as st
 import pandas as pd
-import gspread
-from google.oauth2.service_account import Credentials
+import numpy as np
 import locale
 from streamlit.errors import StreamlitSecretNotFoundError
-from fpdf import FPDF
-from datetime import date, datetime, timedelta
+from datetime import date, datetime
 import os
 import plotly.graph_objects as go
 import yaml
@@ -13,6 +11,14 @@ from yaml.loader import SafeLoader
 import streamlit_authenticator as stauth
 import re
 import time
+import cache_compartilhado
+from armazenamento import obter_armazenamento
+from fila_envios import enfileirar, iniciar as iniciar_fila, listar_envios, reenviar, STATUS_ROTULOS
+from dados import obter_dados, registrar_edicao, idade_dados, revalidando, rejeitados, posicoes_do_monitor, posicoes_periodo, chave_dados
+from agregados import cubo, fatiar, metricas, HORAS_POR_REGISTRO
+from filtros import posicoes_filtradas
+from relatorio_pdf import gerar_pdf
+from cache_memoria import figura, tema_atual, memoizar
 
 # --- CONFIGURAÇÃO DE IDIOMA ---
 try:
@@ -260,6 +266,14 @@ def page_header(title, subtitle):
     </div>
 </div>""", unsafe_allow_html=True)
 
+def freshness_badge(idade, atualizando=False):
+    if idade is None: return
+    if idade < 60: txt = f"{int(idade)} s"
+    elif idade < 3600: txt = f"{int(idade // 60)} min"
+    else: txt = f"{int(idade // 3600)} h"
+    extra = " · atualizando…" if atualizando else ""
+    st.markdown(f"""<p style="margin:0.4rem 0 0;font-size:0.68rem;opacity:0.6;font-weight:500;">Dados atualizados há {txt}{extra}</p>""", unsafe_allow_html=True)
+
 def metric_card(label, value, sub, variant="default"):
     color = "var(--accent)" if variant == "orange" else ("var(--accent2)" if variant == "blue" else "var(--border)")
     bg = "var(--accent-dim)" if variant == "orange" else ("var(--accent2-dim)" if variant == "blue" else "var(--bg-surface)")
@@ -286,181 +300,80 @@ def report_card(row):
 def base_layout(h=220):
     return dict(paper_bgcolor='rgba(0,0,0,0)', plot_bgcolor='rgba(0,0,0,0)', margin=dict(l=8, r=8, t=24, b=8), height=h)
 
-def chart_barras(df):
-    cont = df.groupby('Nome').size().reset_index(name='N').sort_values('N', ascending=True)
+# Os gráficos do painel recebem uma fatia do cubo de agregados (agregados.py), não as linhas
+def chart_barras(cubo):
+    cont = cubo.groupby('Nome', observed=True)['N'].sum().reset_index().sort_values('N', ascending=True)
     fig = go.Figure(go.Bar(x=cont['N'], y=cont['Nome'], orientation='h', marker=dict(color=cont['N'], colorscale=[[0, "rgba(42,106,232,0.3)"], [0.5, "#2A6AE8"], [1, "#E8762A"]])))
     fig.update_layout(**base_layout(h=max(180, len(cont) * 44)), showlegend=False)
     return fig
 
-def chart_linha(df):
-    por = df.groupby(df['Data da atividade'].dt.date).size().reset_index(name='N')
-    fig = go.Figure(go.Scatter(x=por['Data da atividade'], y=por['N'], mode='lines+markers', line=dict(color="#E8762A", width=2.5, shape='spline'), fill='tozeroy', fillcolor="rgba(232,118,42,0.12)"))
+# Série temporal: a resolução acompanha o período escolhido e o número de pontos fica
+# sempre abaixo de PONTOS_MAXIMOS; acima de LIMIAR_WEBGL o traço passa para Scattergl.
+# Limites pensados para o gráfico do painel (200 px de altura): diário até um ano, semanal até seis anos.
+RESOLUCOES = [(365, None), (2190, 'W-MON'), (None, 'MS')]   # (até N dias, regra de reamostragem)
+PONTOS_MAXIMOS = 240
+LIMIAR_WEBGL = 120
+
+def _serie_linha(cubo, inicio=None, fim=None):
+    por = cubo.groupby('Data da atividade')['N'].sum()
+    if por.empty: return por
+    inicio = pd.Timestamp(inicio) if inicio is not None else por.index.min()
+    fim = pd.Timestamp(fim) if fim is not None else por.index.max()
+    dias = (fim - inicio).days
+    regra = next(r for limite, r in RESOLUCOES if limite is None or dias <= limite)
+    if regra: por = por.resample(regra, label='left', closed='left').sum()
+    passo = -(-len(por) // PONTOS_MAXIMOS)
+    if passo > 1:
+        # Orçamento de pontos: soma blocos de `passo` pontos consecutivos (rótulo = início do bloco)
+        por = pd.Series(por.groupby(np.arange(len(por)) // passo).sum().to_numpy(), index=por.index[::passo])
+    return por
+
+def chart_linha(cubo, inicio=None, fim=None):
+    por = _serie_linha(cubo, inicio, fim)
+    if len(por) > LIMIAR_WEBGL:
+        traco = go.Scattergl(x=por.index, y=por.values, mode='lines', line=dict(color="#E8762A", width=2), fill='tozeroy', fillcolor="rgba(232,118,42,0.12)")
+    else:
+        traco = go.Scatter(x=por.index, y=por.values, mode='lines+markers', line=dict(color="#E8762A", width=2.5, shape='spline'), fill='tozeroy', fillcolor="rgba(232,118,42,0.12)")
+    fig = go.Figure(traco)
     fig.update_layout(**base_layout(h=200), showlegend=False)
     return fig
 
-def chart_donut(df):
-    if 'Função' not in df.columns: return None
-    cont = df['Função'].value_counts().reset_index()
+def chart_donut(cubo):
+    if 'Função' not in cubo.columns: return None
+    cont = cubo.groupby('Função', observed=True)['N'].sum().sort_values(ascending=False).reset_index(name='count')
+    cont = cont[cont['count'] > 0]
     fig = go.Figure(go.Pie(labels=cont['Função'], values=cont['count'], hole=0.58, marker=dict(colors=["#E8762A", "#2A6AE8", "#3DB87A"])))
     fig.update_layout(**base_layout(h=230), legend=dict(orientation='h', y=-0.2, x=0.5, xanchor='center'))
     return fig
 
 # ==========================================
-# GESTÃO DE PDF (ESTRITO PRETO E BRANCO)
-# ==========================================
-def limpar_texto(texto):
-    if pd.isna(texto) or texto == "": return ""
-    s = str(texto)
-    subs = {'\u2013':'-','\u2014':'-','\u201c':'"','\u201d':'"','\u2018':"'",'\u2019':"'",'\u2022':'-','\u00e3':'a','\u00e7':'c','\u00e9':'e','\u00ea':'e','\u00f5':'o','\u00fc':'u','\u00e1':'a','\u00ed':'i','\u00f3':'o','\u00fa':'u','\u00c3':'A','\u00c7':'C','\u00e0':'a','\u00e2':'a','\u00f4':'o','\u00f2':'o'}
-    for k, v in subs.items(): s = s.replace(k, v)
-    try: return s.encode('latin-1', 'replace').decode('latin-1')
-    except: return s
-
-def _pagina_pdf(pdf, df_m, nome, mes, ano, prec, visto=False):
-    meses = ["Janeiro","Fevereiro","Marco","Abril","Maio","Junho","Julho","Agosto","Setembro","Outubro","Novembro","Dezembro"]
-    pdf.set_draw_color(0, 0, 0); pdf.set_text_color(0, 0, 0)
-    
-    y_l = [12,12,10,14,12]; h_l = [18,18,22,14,18]; px = [18, 45, 68, 134, 175]
-    imgs = ["ufpi.png", "sus.png", "banner-pet.png", "fms.png", "caps.png"]
-    for x, img, h, y in zip(px, imgs, h_l, y_l):
-        if os.path.exists(img):
-            try: pdf.image(img, x=x, y=y, h=h)
-            except: pass
-                
-    pdf.set_y(30); pdf.set_line_width(0.4)
-    pdf.line(pdf.l_margin, pdf.get_y(), pdf.w - pdf.r_margin, pdf.get_y())
-    pdf.ln(4)
-
-    pdf.set_font("Helvetica", 'B', 10)
-    pdf.cell(0, 6, limpar_texto("UNIVERSIDADE FEDERAL DO PIAUI - UFPI"), ln=True, align='C')
-    pdf.set_font("Helvetica", '', 8)
-    pdf.cell(0, 5, limpar_texto("PROJETO PET SAUDE / I&SD - INFORMACAO E SAUDE DIGITAL"), ln=True, align='C')
-    pdf.ln(2); pdf.line(pdf.l_margin, pdf.get_y(), pdf.w - pdf.r_margin, pdf.get_y())
-    pdf.ln(3); pdf.set_font("Helvetica", 'B', 11)
-    pdf.cell(0, 7, limpar_texto("FOLHA DE FREQUENCIA"), ln=True, align='C')
-    
-    pdf.ln(3); mes_idx = int(mes) - 1 if 1 <= int(mes) <= 12 else 0
-    if df_m.empty or 'Função' not in df_m.columns or pd.isna(df_m.iloc[0]['Função']):
-        fnc = "MONITOR(A)"
-    else:
-        fnc = str(df_m.iloc[0]['Função']).upper()
-    if fnc in ('NAN', '', 'MONITOR', 'MONITORA'): fnc = "MONITOR(A)"
-    
-    for lbl, val in [("MES DE REFERENCIA", f"{meses[mes_idx].upper()} / {ano}"), ("GRUPO TUTORIAL", "Grupo 1 - Letramento p/ Usuarios SUS"), ("LOCAL", "CAPS AD - Teresina / PI"), ("PRECEPTORA", prec), (fnc, nome)]:
-        pdf.set_font("Helvetica", 'B', 8); pdf.cell(44, 5, limpar_texto(f"  {lbl}:"), border=0)
-        pdf.set_font("Helvetica", '', 8);  pdf.cell(0, 5, limpar_texto(val), border=0, ln=True)
-
-    pdf.ln(4); ws = [28, 28, 28, 86]
-    pdf.set_fill_color(220, 220, 220); pdf.set_font("Helvetica", 'B', 8)
-    for h, w in zip(["Data", "Entrada", "Saida", "Atividades Desenvolvidas"], ws): pdf.cell(w, 8, limpar_texto(h), border=1, align='C', fill=True)
-    pdf.ln(); pdf.set_font("Helvetica", '', 8)
-    
-    flip = False
-    for _, row in df_m.sort_values('Data da atividade').iterrows():
-        d = row['Data da atividade'].strftime('%d/%m/%Y'); ent = str(row.get('Horário de Início', '')).strip()
-        try: sai = (datetime.strptime(ent, "%H:%M") + timedelta(hours=4)).strftime("%H:%M")
-        except: sai = ""
-        ativ = limpar_texto(str(row.get('ATIVIDADE(S) REALIZADA(S)', '')).upper())
-
-        if flip:
-            pdf.set_fill_color(245, 245, 245)
-        else:
-            pdf.set_fill_color(255, 255, 255)
-            
-        flip = not flip
-        y0 = pdf.get_y()
-        pdf.cell(ws[0], 5, d, border=0, align='C', fill=True)
-        pdf.cell(ws[1], 5, ent, border=0, align='C', fill=True)
-        pdf.cell(ws[2], 5, sai, border=0, align='C', fill=True)
-        pdf.multi_cell(ws[3], 5, ativ, border=1, align='L', fill=True)
-        y1 = pdf.get_y(); h_r = y1 - y0
-        pdf.rect(pdf.l_margin, y0, ws[0], h_r); pdf.rect(pdf.l_margin+ws[0], y0, ws[1], h_r); pdf.rect(pdf.l_margin+ws[0]+ws[1], y0, ws[2], h_r)
-        pdf.set_y(y1)
-        if pdf.get_y() > 255: pdf.add_page()
-
-    pdf.ln(8); pdf.set_font("Helvetica", '', 9)
-    pdf.cell(0, 5, limpar_texto(f"Assinatura do {fnc}: _________________________________________________"), ln=True)
-    if visto:
-        pdf.ln(10); pdf.cell(0, 5, limpar_texto(f"Visto do Preceptor (Consolidado): ____________________________  Data: {date.today().strftime('%d/%m/%Y')}"), ln=True)
-
-def gerar_pdf(df_geral, nomes, mes, ano):
-    pdf = FPDF(); pdf.set_auto_page_break(auto=True, margin=15)
-    nomes_com_dados = [n for n in nomes if not df_geral[df_geral['Nome'] == n].empty]
-    for i, nome in enumerate(nomes_com_dados):
-        pdf.add_page(); df_i = df_geral[df_geral['Nome'] == nome].copy()
-        prec = df_i['Nome do preceptor'].iloc[0] if 'Nome do preceptor' in df_i.columns and not df_i.empty else "___"
-        _pagina_pdf(pdf, df_i, nome, mes, ano, prec, visto=(i == len(nomes_com_dados)-1))
-
-    saida = pdf.output(dest='S')
-    return saida.encode('latin-1') if isinstance(saida, str) else bytes(saida)
-
-# ==========================================
-# GESTÃO DE DADOS (GOOGLE SHEETS)
+# GESTÃO DE DADOS (GOOGLE SHEETS / SQLITE)
 # ==========================================
-URL_PLANILHA = "https://docs.google.com/spreadsheets/d/1PwDHHAD4ITWZoHuPpFVBE7t3kJy3Wxaw5APSVomBVOA/edit?usp=sharing"
-
-@st.cache_data(ttl=60)
 def carregar_dados():
     try:
-        scopes = ["https://www.googleapis.com/auth/spreadsheets", "https://www.googleapis.com/auth/drive.file"]
-        if "gcp_service_account" in st.secrets:
-            creds_dict = dict(st.secrets["gcp_service_account"])
-            creds_dict['private_key'] = creds_dict['private_key'].replace('\\n', '\n')
-            creds = Credentials.from_service_account_info(creds_dict, scopes=scopes)
-        else:
-            creds = Credentials.from_service_account_file("credentials.json", scopes=scopes)
-        
-        client = gspread.authorize(creds)
-        vals = client.open_by_url(URL_PLANILHA).sheet1.get_all_values()
-        if len(vals) <= 1: return pd.DataFrame()
-        dados = pd.DataFrame(vals[1:], columns=vals[0])
-        dados.columns = dados.columns.str.strip()
-        if 'Data da atividade' in dados.columns:
-            dados['Data da atividade'] = pd.to_datetime(dados['Data da atividade'], errors='coerce', dayfirst=True)
-        if 'Horário de Início' in dados.columns:
-            limpos = dados['Horário de Início'].astype(str).str.extract(r'(\d{1,2}:\d{2})')[0]
-            dados['Horário de Início'] = pd.to_datetime(limpos, format='%H:%M', errors='coerce').dt.strftime('%H:%M')
-        return dados.dropna(subset=['Data da atividade'])
+        return obter_dados()
     except Exception as e:
         st.error(f"Erro ao carregar banco: {e}"); return pd.DataFrame()
 
 def salvar_nova_atividade(lista):
+    # Grava no diário local; a fila envia em lote para a planilha com novas tentativas
     try:
-        scopes = ["https://www.googleapis.com/auth/spreadsheets", "https://www.googleapis.com/auth/drive.file"]
-        if "gcp_service_account" in st.secrets:
-            creds_dict = dict(st.secrets["gcp_service_account"])
-            creds_dict['private_key'] = creds_dict['private_key'].replace('\\n', '\n')
-            creds = Credentials.from_service_account_info(creds_dict, scopes=scopes)
-        else:
-            creds = Credentials.from_service_account_file("credentials.json", scopes=scopes)
-        gspread.authorize(creds).open_by_url(URL_PLANILHA).sheet1.append_row(lista)
+        enfileirar(lista)
         return True
     except: return False
 
 def atualizar_atividade(carimbo, nome, nova_linha):
     try:
-        scopes = ["https://www.googleapis.com/auth/spreadsheets", "https://www.googleapis.com/auth/drive.file"]
-        if "gcp_service_account" in st.secrets:
-            creds_dict = dict(st.secrets["gcp_service_account"])
-            creds_dict['private_key'] = creds_dict['private_key'].replace('\\n', '\n')
-            creds = Credentials.from_service_account_info(creds_dict, scopes=scopes)
-        else:
-            creds = Credentials.from_service_account_file("credentials.json", scopes=scopes)
-        client = gspread.authorize(creds)
-        planilha = client.open_by_url(URL_PLANILHA).sheet1
-        registros = planilha.get_all_values()
-        row_idx = -1
-        for i, r in enumerate(registros):
-            if r[0] == carimbo and r[1] == nome:
-                row_idx = i + 1
-                break
-        if row_idx != -1:
-            planilha.update(range_name=f"A{row_idx}:O{row_idx}", values=[nova_linha])
-            return True
-        return False
+        linha = obter_armazenamento().atualizar(carimbo, nome, nova_linha)
+        if linha is None: return False
+        registrar_edicao(linha, nova_linha)
+        return True
     except: return False
 
 
+iniciar_fila()
+
+
 # ==========================================
 # 🔐 AUTENTICAÇÃO
 # ==========================================
@@ -782,11 +695,11 @@ if st.session_state.get("authentication_status"):
             hoje = date.today(); sel_d = st.sidebar.date_input("Período", value=(hoje.replace(day=1), hoje))
             d1, d2 = sel_d if (isinstance(sel_d, tuple) and len(sel_d)==2) else (hoje, hoje)
 
-            df_f = df.copy()
-            if m_sel: df_f = df_f[df_f['Nome'].isin(m_sel)]
-            if p_sel: df_f = df_f[df_f['Nome do preceptor'].isin(p_sel)]
-                
-            df_f = df_f[(df_f['Data da atividade'].dt.date >= d1) & (df_f['Data da atividade'].dt.date <= d2)]
+            # Um único recorte no final (posições memoizadas por versão + filtros), em ordem crescente de data
+            pos_f = posicoes_filtradas(df, m_sel, p_sel, d1, d2)
+            df_f = df.iloc[pos_f]
+            cubo_f = fatiar(cubo(df), m_sel, p_sel, d1, d2)
+            met = metricas(cubo_f)
 
             if m_sel and not df_f.empty:
                 sidebar_divider()
@@ -794,27 +707,40 @@ if st.session_state.get("authentication_status"):
                 # Usa a data mais recente do filtro para o PDF; fallback para d1 se df_f ficar vazio
                 datas_validas = df_f['Data da atividade'].dropna()
                 ref_date = datas_validas.iloc[-1] if not datas_validas.empty else pd.Timestamp(d2)
-                pdf_b = gerar_pdf(df_f, m_sel, ref_date.month, ref_date.year)
-                st.sidebar.download_button(f"Baixar Frequências ({len(m_sel)})", pdf_b, f"Frequencias_PET.pdf", "application/pdf")
+                # Gerado só no clique (data=callable). Cache em dois níveis por (versão dos dados, filtros,
+                # mês de referência): LRU em memória no processo e disco compartilhado entre workers.
+                chave_pdf = (chave_dados(df), tuple(m_sel), tuple(p_sel), d1, d2, ref_date.month, ref_date.year, hoje)
+                def pdf_sob_demanda(chave_pdf=chave_pdf, df=df, pos_f=pos_f, m_sel=m_sel, ref_date=ref_date):
+                    return memoizar("pdf", chave_pdf, lambda: cache_compartilhado.bytes_ou_calcular(
+                        "pdf", cache_compartilhado.chave(*chave_pdf), lambda: gerar_pdf(df, m_sel, ref_date.month, ref_date.year, pos_f)))
+                st.sidebar.download_button(f"Baixar Frequências ({len(m_sel)})", pdf_sob_demanda, f"Frequencias_PET.pdf", "application/pdf")
 
             page_header("Painel de Gestão", "Monitoramento centralizado de atividades e frequências.")
+            freshness_badge(idade_dados(), revalidando())
+            ignorados = rejeitados()
+            if ignorados:
+                with st.expander(f"⚠️ {len(ignorados)} registro(s) da planilha ignorado(s) por data inválida"):
+                    st.caption("Corrija a coluna \"Data da atividade\" destas linhas na planilha para que voltem a contar nos relatórios.")
+                    st.dataframe(pd.DataFrame(ignorados), hide_index=True, use_container_width=True)
             section_label("Métricas do Período")
             k1, k2, k3, k4 = st.columns(4)
-            with k1: st.markdown(metric_card("Total Registros", len(df_f), "atividades enviadas", "orange"), unsafe_allow_html=True)
-            with k2: st.markdown(metric_card("Monitores Ativos", df_f['Nome'].nunique(), "participantes", "blue"), unsafe_allow_html=True)
-            with k3: st.markdown(metric_card("Horas Totais", f"{len(df_f)*4}h", "4h por registro"), unsafe_allow_html=True)
-            with k4: st.markdown(metric_card("Preceptores", df_f['Nome do preceptor'].nunique(), "responsáveis"), unsafe_allow_html=True)
+            with k1: st.markdown(metric_card("Total Registros", met['registros'], "atividades enviadas", "orange"), unsafe_allow_html=True)
+            with k2: st.markdown(metric_card("Monitores Ativos", met['monitores'], "participantes", "blue"), unsafe_allow_html=True)
+            with k3: st.markdown(metric_card("Horas Totais", f"{met['horas']}h", f"{HORAS_POR_REGISTRO}h por registro"), unsafe_allow_html=True)
+            with k4: st.markdown(metric_card("Preceptores", met['preceptores'], "responsáveis"), unsafe_allow_html=True)
 
             section_label("Análise de Frequência")
             g1, g2 = st.columns([3, 2])
-            with g1: st.plotly_chart(chart_barras(df_f), use_container_width=True)
+            # Figuras memoizadas por (versão dos dados, filtros, tema)
+            assinatura = (chave_dados(df), tuple(m_sel), tuple(p_sel), d1, d2, tema_atual())
+            with g1: st.plotly_chart(figura(("barras",) + assinatura, lambda: chart_barras(cubo_f)), use_container_width=True)
             with g2: 
-                fig_dn = chart_donut(df_f)
+                fig_dn = figura(("donut",) + assinatura, lambda: chart_donut(cubo_f))
                 if fig_dn: st.plotly_chart(fig_dn, use_container_width=True)
-            st.plotly_chart(chart_linha(df_f), use_container_width=True)
+            st.plotly_chart(figura(("linha",) + assinatura, lambda: chart_linha(cubo_f, d1, d2)), use_container_width=True)
 
             section_label("Consulta Detalhada de Relatórios")
-            df_v = df_f.sort_values('Data da atividade', ascending=False)
+            df_v = df_f.iloc[::-1]
             if not df_v.empty:
                 ce, cd = st.columns([2, 3])
                 with ce:
@@ -872,17 +798,27 @@ if st.session_state.get("authentication_status"):
                             ativ, obje, relat, refl, ", ".join(orie) if orie else "Nenhuma", user_data.get('funcao', 'Monitor')
                         ]
                         if salvar_nova_atividade(linha):
-                            st.toast("Transação Efetuada: Registro salvo no banco de dados.", icon="✅")
-                            st.success("Tudo certo! O formulário foi esvaziado e está pronto para uma nova entrada.")
-                            carregar_dados.clear()
+                            st.toast("Transação Efetuada: Registro recebido e na fila de gravação.", icon="✅")
+                            st.success("Tudo certo! O formulário foi esvaziado e está pronto para uma nova entrada. Acompanhe a gravação em \"Meu Histórico\".")
+                        else:
+                            st.error("Não foi possível registrar a atividade. Tente novamente.")
 
         with aba2:
+            envios = listar_envios(st.session_state['name'])
+            if envios:
+                section_label("Envios em processamento")
+                for env in envios:
+                    cor = "#DC2626" if env['status'] == 'erro' else "var(--accent)"
+                    det = f" · {env['tentativas']} tentativa(s)" if env['tentativas'] else ""
+                    st.markdown(f"<div class='list-row' style='display:flex;justify-content:space-between;font-size:0.8rem;'><span>{env['linha'][6]} às {env['linha'][8]} · {env['linha'][7]}</span><span style='color:{cor};font-weight:700;'>{STATUS_ROTULOS.get(env['status'], env['status'])}{det}</span></div>", unsafe_allow_html=True)
+                    if env['status'] == 'erro' and st.button("Tentar novamente", key=f"btn_reenviar_{env['id']}"):
+                        reenviar(env['id'], st.session_state['name']); st.rerun()
             df = carregar_dados()
             if df.empty or 'Nome' not in df.columns:
                 st.warning("Banco de dados indisponível.")
             else:
-                nome_busca = st.session_state['name'].strip().lower()
-                df_meu = df[df['Nome'].astype(str).str.strip().str.lower() == nome_busca].copy()
+                pos_meu = posicoes_do_monitor(df, st.session_state['name'])
+                df_meu = df.iloc[pos_meu]
                 
                 if df_meu.empty:
                     st.info("Nenhum registro localizado sob suas credenciais.")
@@ -942,7 +878,7 @@ if st.session_state.get("authentication_status"):
                                     ]
                                     if atualizar_atividade(row['Carimbo de data/hora'], st.session_state['name'], linha_atualizada):
                                         st.toast("Modificação salva no sistema.", icon="✅")
-                                        carregar_dados.clear(); st.session_state.acao_monitor = 'lista'; st.rerun()
+                                        st.session_state.acao_monitor = 'lista'; st.rerun()
 
                     else:
                         st.markdown("<p style='font-size:0.85rem; color:var(--text-secondary); margin-bottom:1rem;'>Selecione [ Detalhes ] para visualizar a entrada completa ou [ Editar ] para corrigir informações.</p>", unsafe_allow_html=True)
@@ -953,8 +889,7 @@ if st.session_state.get("authentication_status"):
                             f_ini = f_fim = _date_range[0]
                         else:
                             f_ini = f_fim = _date_range if isinstance(_date_range, date) else date.today()
-                        df_filt = df_meu[(df_meu['Data da atividade'].dt.date >= f_ini) & (df_meu['Data da atividade'].dt.date <= f_fim)]
-                        df_filt = df_filt.sort_values('Data da atividade', ascending=False)
+                        df_filt = df.iloc[posicoes_periodo(df, f_ini, f_fim, pos_meu)[::-1]]
                         
                         st.markdown("<div style='display:flex; font-weight:700; color:var(--text-muted); font-size:0.75rem; border-bottom:1px solid var(--border); padding-bottom:0.5rem; margin-bottom:0.5rem;'><div style='flex:1;'>DATA / HORÁRIO</div><div style='flex:1.5;'>PRECEPTOR(A)</div><div style='flex:1.5;'>LOCAL</div><div style='flex:1; text-align:right;'>AÇÕES</div></div>", unsafe_allow_html=True)
                         for idx, row in df_filt.iterrows():
@@ -1,7 +1,5 @@
 import streamlit as st
 import pandas as pd
-import gspread
-from google.oauth2.service_account import Credentials
 import locale
 from streamlit.errors import StreamlitSecretNotFoundError
 from fpdf import FPDF
@@ -12,6 +10,7 @@ import yaml
 from yaml.loader import SafeLoader
 import streamlit_authenticator as stauth
 import re
+from planilha import executar
 
 # --- CONFIGURAÇÃO DE IDIOMA ---
 try:
@@ -285,15 +284,10 @@ def gerar_pdf(df_geral, nomes, mes, ano):
 # ==========================================
 # GESTÃO DE DADOS (GOOGLE SHEETS)
 # ==========================================
-URL_PLANILHA = "https://docs.google.com/spreadsheets/d/1PwDHHAD4ITWZoHuPpFVBE7t3kJy3Wxaw5APSVomBVOA/edit?usp=sharing"
-
 @st.cache_data(ttl=60)
 def carregar_dados():
     try:
-        scopes = ["https://www.googleapis.com/auth/spreadsheets", "https://www.googleapis.com/auth/drive.file"]
-        creds = Credentials.from_service_account_file(os.path.join(os.path.dirname(os.path.abspath(__file__)), "credentials.json"), scopes=scopes)
-        client = gspread.authorize(creds)
-        vals = client.open_by_url(URL_PLANILHA).sheet1.get_all_values()
+        vals = executar(lambda aba: aba.get_all_values())
         
         if len(vals) <= 1: return pd.DataFrame()
         
@@ -312,30 +306,25 @@ def carregar_dados():
 
 def salvar_nova_atividade(lista):
     try:
-        scopes = ["https://www.googleapis.com/auth/spreadsheets", "https://www.googleapis.com/auth/drive.file"]
-        creds = Credentials.from_service_account_file("credentials.json", scopes=scopes)
-        gspread.authorize(creds).open_by_url(URL_PLANILHA).sheet1.append_row(lista)
+        executar(lambda aba: aba.append_row(lista), idempotente=False)
         return True
     except: return False
 
 def atualizar_atividade(carimbo, nome, nova_linha):
     try:
-        scopes = ["https://www.googleapis.com/auth/spreadsheets", "https://www.googleapis.com/auth/drive.file"]
-        creds = Credentials.from_service_account_file("credentials.json", scopes=scopes)
-        client = gspread.authorize(creds)
-        planilha = client.open_by_url(URL_PLANILHA).sheet1
-
-        registros = planilha.get_all_values()
-        row_idx = -1
-        for i, r in enumerate(registros):
-            if r[0] == carimbo and r[1] == nome:
-                row_idx = i + 1
-                break
-
-        if row_idx != -1:
-            planilha.update(range_name=f"A{row_idx}:O{row_idx}", values=[nova_linha])
-            return True
-        return False
+        def _atualizar(planilha):
+            registros = planilha.get_all_values()
+            row_idx = -1
+            for i, r in enumerate(registros):
+                if r[0] == carimbo and r[1] == nome:
+                    row_idx = i + 1
+                    break
+
+            if row_idx != -1:
+                planilha.update(range_name=f"A{row_idx}:O{row_idx}", values=[nova_linha])
+                return True
+            return False
+        return executar(_atualizar)
     except Exception as e:
         st.error(f"Erro na comunicação com o banco: {e}")
         return False
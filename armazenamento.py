@@ -0,0 +1,231 @@
+import os
+import sqlite3
+import threading
+from abc import ABC, abstractmethod
+
+import gspread
+import streamlit as st
+from streamlit.errors import StreamlitSecretNotFoundError
+
+import planilha
+from esquema import data_iso
+
+# ==========================================
+# ARMAZENAMENTO PLUGÁVEL
+# ==========================================
+# Toda a persistência passa por um Armazenamento. As linhas trafegam como listas de
+# strings no formato da planilha (cabeçalho na linha 1, dados a partir da linha 2),
+# então o restante do app não precisa saber qual motor está por trás.
+# Escolha por configuração: PET_ARMAZENAMENTO=planilha|sqlite (ou `armazenamento` nos Secrets).
+PASTA_CACHE = os.environ.get("PET_CACHE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache"))
+ARQUIVO_SQLITE = os.environ.get("PET_SQLITE", os.path.join(PASTA_CACHE, "atividades.db"))
+ULTIMA_COLUNA = "O"
+
+CABECALHO = [
+    "Carimbo de data/hora", "Nome", "Status", "tutores presentes", "Nome do preceptor", "Status do preceptor",
+    "Data da atividade", "Local Específico:", "Horário de Início", "ATIVIDADE(S) REALIZADA(S)",
+    "OBJETIVO DA(S) ATIVIDADE(S)", "RELATO FUNDAMENTADO", "REFLEXÕES CRÍTICAS", "Orientadora de serv", "Função",
+]
+
+
+class Armazenamento(ABC):
+    @abstractmethod
+    def carregar(self):
+        # Todas as linhas, cabeçalho incluído
+        ...
+
+    @abstractmethod
+    def ler_a_partir(self, n):
+        # Linhas posteriores à linha n (numeração 1-based, como na planilha)
+        ...
+
+    @abstractmethod
+    def chaves(self):
+        # Coluna de carimbos (A), cabeçalho incluído
+        ...
+
+    @abstractmethod
+    def anexar(self, linhas):
+        # Insere as linhas no fim e devolve o nº da primeira linha gravada (ou None)
+        ...
+
+    @abstractmethod
+    def atualizar(self, carimbo, nome, linha):
+        # Substitui a linha identificada por (carimbo, nome); devolve o nº da linha ou None
+        ...
+
+    @abstractmethod
+    def localizar(self, carimbo, nome):
+        # Nº da linha identificada por (carimbo, nome), ou None se não estiver gravada
+        ...
+
+    def consultar(self, inicio=None, fim=None, nomes=None):
+        # Nºs das linhas com Data da atividade entre inicio/fim (date) e Nome em nomes;
+        # None = o motor não filtra no servidor e o chamador filtra em memória
+        return None
+
+    def revisao(self):
+        # Marcador barato que muda a cada escrita; None = desconhecido (sincroniza como antes)
+        return None
+
+    def erro_transitorio(self, erro):
+        return False
+
+    def escrita_incerta(self, erro):
+        # A escrita falhou mas pode ter sido aplicada (ex.: timeout depois do envio)
+        return False
+
+
+class ArmazenamentoPlanilha(Armazenamento):
+    def carregar(self):
+        return planilha.executar(lambda aba: aba.get_all_values())
+
+    def ler_a_partir(self, n):
+        try:
+            return [list(r) for r in planilha.executar(lambda aba: aba.get(f"A{n + 1}:{ULTIMA_COLUNA}"))]
+        except gspread.exceptions.APIError as erro:
+            # Intervalo além do tamanho da grade: não há linhas novas
+            if erro.code == 400: return []
+            raise
+
+    def chaves(self):
+        return planilha.executar(lambda aba: aba.col_values(1))
+
+    def anexar(self, linhas):
+        resp = planilha.executar(lambda aba: aba.append_rows(linhas), idempotente=False)
+        primeira = planilha.linha_do_intervalo(resp)
+        if primeira is not None:
+            for n, linha in enumerate(linhas):
+                planilha.registrar_linha(linha[0], linha[1], primeira + n)
+        return primeira
+
+    def localizar(self, carimbo, nome):
+        return planilha.localizar_linha(carimbo, nome)
+
+    def atualizar(self, carimbo, nome, linha):
+        row_idx = planilha.localizar_linha(carimbo, nome)
+        if row_idx is None: return None
+        planilha.executar(lambda aba: aba.update(range_name=f"A{row_idx}:{ULTIMA_COLUNA}{row_idx}", values=[linha]))
+        return row_idx
+
+    def revisao(self):
+        return planilha.revisao_planilha()
+
+    def erro_transitorio(self, erro):
+        return planilha.erro_transitorio(erro)
+
+    def escrita_incerta(self, erro):
+        return planilha.escrita_incerta(erro)
+
+
+class ArmazenamentoSQLite(Armazenamento):
+    # Tabela única no formato da planilha; `linha` reproduz a numeração da planilha (dados a partir de 2)
+    def __init__(self, caminho=ARQUIVO_SQLITE):
+        self.caminho = caminho
+        self._local = threading.local()
+        pasta = os.path.dirname(caminho)
+        if pasta: os.makedirs(pasta, exist_ok=True)
+        con = self._con()
+        colunas = ", ".join(f'"{c}" TEXT NOT NULL DEFAULT \'\'' for c in CABECALHO)
+        # data_iso: cópia ordenável de "Data da atividade" (o texto dd/mm/aaaa não serve para intervalos)
+        con.execute(f"CREATE TABLE IF NOT EXISTS atividades (linha INTEGER PRIMARY KEY, {colunas}, data_iso TEXT)")
+        con.execute('CREATE INDEX IF NOT EXISTS idx_atividades_nome ON atividades("Nome", data_iso)')
+        con.execute("CREATE INDEX IF NOT EXISTS idx_atividades_data ON atividades(data_iso)")
+        con.execute('CREATE INDEX IF NOT EXISTS idx_atividades_carimbo ON atividades("Carimbo de data/hora", "Nome")')
+        # Contador de revisão mantido por gatilhos: qualquer escrita (deste ou de outro processo) o incrementa
+        con.execute("CREATE TABLE IF NOT EXISTS revisao (id INTEGER PRIMARY KEY CHECK (id = 1), valor INTEGER NOT NULL)")
+        con.execute("INSERT OR IGNORE INTO revisao (id, valor) VALUES (1, 0)")
+        for evento in ("INSERT", "UPDATE", "DELETE"):
+            con.execute(f"CREATE TRIGGER IF NOT EXISTS trg_revisao_{evento.lower()} AFTER {evento} ON atividades "
+                        f"BEGIN UPDATE revisao SET valor = valor + 1 WHERE id = 1; END")
+
+    def _con(self):
+        # Uma conexão por thread (a fila de envios e a revalidação rodam em threads próprias)
+        con = getattr(self._local, "con", None)
+        if con is None:
+            con = sqlite3.connect(self.caminho, timeout=30, isolation_level=None)
+            con.execute("PRAGMA journal_mode=WAL")
+            con.execute("PRAGMA synchronous=NORMAL")
+            self._local.con = con
+        return con
+
+    def _selecionar(self, onde="", parametros=()):
+        colunas = ", ".join(f'"{c}"' for c in CABECALHO)
+        cur = self._con().execute(f"SELECT {colunas} FROM atividades {onde} ORDER BY linha", parametros)
+        return [list(r) for r in cur.fetchall()]
+
+    def _valores(self, linha):
+        linha = [str(v) for v in (list(linha) + [""] * len(CABECALHO))[:len(CABECALHO)]]
+        return linha + [data_iso(linha[CABECALHO.index("Data da atividade")])]
+
+    def carregar(self):
+        return [list(CABECALHO)] + self._selecionar()
+
+    def ler_a_partir(self, n):
+        return self._selecionar("WHERE linha > ?", (n,))
+
+    def chaves(self):
+        cur = self._con().execute('SELECT "Carimbo de data/hora" FROM atividades ORDER BY linha')
+        return [CABECALHO[0]] + [r[0] for r in cur.fetchall()]
+
+    def anexar(self, linhas):
+        con = self._con()
+        marcadores = ", ".join("?" for _ in range(len(CABECALHO) + 2))
+        colunas = ", ".join(f'"{c}"' for c in CABECALHO)
+        con.execute("BEGIN IMMEDIATE")
+        try:
+            primeira = (con.execute("SELECT COALESCE(MAX(linha), 1) FROM atividades").fetchone()[0]) + 1
+            con.executemany(f"INSERT INTO atividades (linha, {colunas}, data_iso) VALUES ({marcadores})",
+                            [[primeira + n] + self._valores(l) for n, l in enumerate(linhas)])
+            con.execute("COMMIT")
+        except Exception:
+            con.execute("ROLLBACK"); raise
+        return primeira
+
+    def localizar(self, carimbo, nome):
+        return self._con().execute('SELECT MIN(linha) FROM atividades WHERE "Carimbo de data/hora" = ? AND "Nome" = ?',
+                                   (carimbo, nome)).fetchone()[0]
+
+    def atualizar(self, carimbo, nome, linha):
+        con = self._con()
+        achada = self.localizar(carimbo, nome)
+        if achada is None: return None
+        atribuicoes = ", ".join(f'"{c}" = ?' for c in CABECALHO)
+        con.execute(f"UPDATE atividades SET {atribuicoes}, data_iso = ? WHERE linha = ?", self._valores(linha) + [achada])
+        return achada
+
+    def consultar(self, inicio=None, fim=None, nomes=None):
+        filtros, parametros = [], []
+        if inicio: filtros.append("data_iso >= ?"); parametros.append(inicio.isoformat())
+        if fim: filtros.append("data_iso <= ?"); parametros.append(fim.isoformat())
+        if nomes is not None:
+            nomes = list(nomes)
+            if not nomes: return []
+            filtros.append(f'"Nome" IN ({", ".join("?" for _ in nomes)})'); parametros += nomes
+        onde = ("WHERE " + " AND ".join(filtros)) if filtros else ""
+        return [r[0] for r in self._con().execute(f"SELECT linha FROM atividades {onde}", parametros).fetchall()]
+
+    def revisao(self):
+        return str(self._con().execute("SELECT valor FROM revisao WHERE id = 1").fetchone()[0])
+
+    def erro_transitorio(self, erro):
+        # "database is locked" e afins
+        return isinstance(erro, sqlite3.OperationalError)
+
+
+def _configuracao():
+    motor = os.environ.get("PET_ARMAZENAMENTO")
+    if motor: return motor.strip().lower()
+    try:
+        if "armazenamento" in st.secrets: return str(st.secrets["armazenamento"]).strip().lower()
+    except (StreamlitSecretNotFoundError, FileNotFoundError):
+        pass
+    return "planilha"
+
+
+@st.cache_resource(show_spinner=False)
+def obter_armazenamento():
+    motor = _configuracao()
+    if motor == "sqlite": return ArmazenamentoSQLite()
+    if motor == "planilha": return ArmazenamentoPlanilha()
+    raise ValueError(f"Armazenamento desconhecido: {motor}")
@@ -0,0 +1,88 @@
+import hashlib
+import json
+import os
+import threading
+import time
+
+from armazenamento import PASTA_CACHE
+
+# ==========================================
+# CACHE COMPARTILHADO ENTRE PROCESSOS (DISCO)
+# ==========================================
+# Artefatos derivados (hoje, os PDFs de frequência) gravados uma vez e lidos por todos os
+# workers. A chave inclui a versão dos dados (dados.chave_dados), então não há invalidação:
+# versões antigas simplesmente deixam de ser pedidas e saem pela poda LRU.
+PASTA_COMPARTILHADA = os.path.join(PASTA_CACHE, "compartilhado")
+ATIVO = os.environ.get("PET_CACHE_COMPARTILHADO", "1") != "0"
+LIMITE_BYTES = int(os.environ.get("PET_CACHE_COMPARTILHADO_MB", 256)) * 1024 * 1024
+INTERVALO_PODA = 60
+
+_poda = {"em": 0.0, "lock": threading.Lock()}
+
+
+def chave(*partes):
+    return hashlib.sha1(json.dumps(partes, default=str, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+
+def _caminho(espaco, k, extensao):
+    return os.path.join(PASTA_COMPARTILHADA, espaco, f"{k}.{extensao}")
+
+
+def _gravar(caminho, escrever):
+    os.makedirs(os.path.dirname(caminho), exist_ok=True)
+    temporario = f"{caminho}.{os.getpid()}.{threading.get_ident()}.tmp"
+    escrever(temporario)
+    os.replace(temporario, caminho)
+    _podar()
+
+
+def _tocar(caminho):
+    # mtime = último acesso, usado pela poda LRU
+    try: os.utime(caminho)
+    except OSError: pass
+
+
+def obter_bytes(espaco, k):
+    if not ATIVO: return None
+    caminho = _caminho(espaco, k, "bin")
+    try:
+        with open(caminho, "rb") as f: valor = f.read()
+    except OSError:
+        return None
+    _tocar(caminho)
+    return valor
+
+
+def guardar_bytes(espaco, k, valor):
+    if not ATIVO: return
+    def escrever(destino):
+        with open(destino, "wb") as f: f.write(valor)
+    try: _gravar(_caminho(espaco, k, "bin"), escrever)
+    except OSError: pass
+
+
+def bytes_ou_calcular(espaco, k, calcular):
+    valor = obter_bytes(espaco, k)
+    if valor is None:
+        valor = calcular()
+        guardar_bytes(espaco, k, valor)
+    return valor
+
+
+def _podar():
+    # Mantém a pasta abaixo de LIMITE_BYTES apagando os arquivos acessados há mais tempo
+    with _poda["lock"]:
+        if time.time() - _poda["em"] < INTERVALO_PODA: return
+        _poda["em"] = time.time()
+    arquivos = []
+    for raiz, _, nomes in os.walk(PASTA_COMPARTILHADA):
+        for nome in nomes:
+            caminho = os.path.join(raiz, nome)
+            try: info = os.stat(caminho)
+            except OSError: continue
+            arquivos.append((info.st_mtime, info.st_size, caminho))
+    total = sum(tamanho for _, tamanho, _ in arquivos)
+    for _, tamanho, caminho in sorted(arquivos):
+        if total <= LIMITE_BYTES: break
+        try: os.remove(caminho); total -= tamanho
+        except OSError: pass
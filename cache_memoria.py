@@ -0,0 +1,50 @@
+import threading
+from collections import OrderedDict
+
+import streamlit as st
+
+# ==========================================
+# CACHES EM MEMÓRIA (LRU COM LIMITE DE BYTES)
+# ==========================================
+# Um LRU por espaço ("figuras", "pdf"), compartilhado por todas as sessões do processo.
+# O tamanho de cada entrada é medido uma única vez, na inserção; ao passar do limite
+# do espaço, as entradas usadas há mais tempo saem primeiro.
+LIMITES = {"figuras": 64 * 1024 * 1024, "pdf": 64 * 1024 * 1024}
+
+
+@st.cache_resource(show_spinner=False)
+def _memoria():
+    return {"espacos": {}, "lock": threading.Lock()}
+
+
+def memoizar(espaco, chave, construir, medir=len):
+    m = _memoria()
+    with m["lock"]:
+        cache = m["espacos"].setdefault(espaco, {"itens": OrderedDict(), "bytes": 0})
+        if chave in cache["itens"]:
+            cache["itens"].move_to_end(chave)
+            return cache["itens"][chave][0]
+    valor = construir()
+    if valor is None: return None
+    tamanho, limite = medir(valor), LIMITES[espaco]
+    with m["lock"]:
+        if chave not in cache["itens"] and tamanho <= limite:
+            cache["itens"][chave] = (valor, tamanho)
+            cache["bytes"] += tamanho
+            while cache["bytes"] > limite:
+                _, (_, liberado) = cache["itens"].popitem(last=False)
+                cache["bytes"] -= liberado
+    return valor
+
+
+# Figuras Plotly: chave = (gráfico, versão dos dados, filtros, tema). Reruns causados por
+# outros widgets (ex.: o selectbox da consulta detalhada) reaproveitam a figura pronta; o
+# tamanho é o do JSON serializado. As figuras guardadas nunca são alteradas: o
+# st.plotly_chart trabalha sobre uma cópia (to_dict).
+def tema_atual():
+    try: return st.context.theme.type
+    except Exception: return None
+
+
+def figura(chave, construir):
+    return memoizar("figuras", chave, construir, medir=lambda fig: len(fig.to_json()))
@@ -0,0 +1,435 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
+import streamlit as st
+
+from armazenamento import PASTA_CACHE, obter_armazenamento
+from esquema import interpretar, aplicar_esquema
+
+try:
+    import fcntl
+except ImportError:  # Windows: fica só a coordenação dentro do processo
+    fcntl = None
+
+# ==========================================
+# SINCRONIZAÇÃO INCREMENTAL DA PLANILHA
+# ==========================================
+# A planilha é praticamente só de inserções: guardamos quantas linhas já foram
+# lidas e, nas próximas sincronizações, buscamos apenas o intervalo novo
+# (A{n+1}:O). O índice do DataFrame é o número da linha na planilha.
+INTERVALO_CHECAGEM = 600          # segundos entre checksums da coluna de carimbos
+INTERVALO_RECARGA_COMPLETA = 1800 # recarga completa periódica (rede de segurança se a fonte não informa revisão)
+
+# Snapshot local (Feather) para partidas a quente: servido na hora e reconciliado em segundo plano.
+# Lido com memory map: na partida a quente e quando um worker adota o snapshot de outro, as
+# colunas de texto apontam para as páginas do arquivo; a cauda lida por cada worker é privada.
+ARQUIVO_SNAPSHOT = os.path.join(PASTA_CACHE, "atividades.feather")
+VERSAO_ESQUEMA = 3                # incrementar sempre que esquema.py mudar o formato das colunas
+
+# Stale-while-revalidate: acima de TTL_DADOS a revalidação roda em segundo plano e
+# quem chega recebe os dados atuais; acima de MAX_DEFASAGEM a chamada espera a recarga.
+# Cada revalidação começa pela revisão da fonte (só metadados), então o TTL pode ser curto.
+TTL_DADOS = 30
+MAX_DEFASAGEM = int(os.environ.get("PET_MAX_DEFASAGEM", 600))
+
+# Single-flight entre processos (vários workers atrás de um balanceador): quem segura a
+# trava de arquivo busca na fonte e grava o snapshot. Os demais, ao esperar a trava ou ao
+# revalidar mais tarde, adotam o snapshot se ele já estiver na revisão atual da fonte.
+ARQUIVO_TRAVA = os.path.join(PASTA_CACHE, "sincronizacao.lock")
+TRAVA_ENTRE_PROCESSOS = os.environ.get("PET_TRAVA_PROCESSOS", "1") != "0"
+ESPERA_TRAVA = 60                 # segundos; depois disso sincroniza sem a trava
+
+
+@st.cache_resource(show_spinner=False)
+def _estado():
+    return {
+        "lock": threading.Lock(), "lock_revalidacao": threading.Lock(), "df": None, "cabecalho": None, "linhas": 0,
+        "carimbos": [], "checado_em": 0.0, "recarregado_em": 0.0, "sujo": False,
+        "erro": None, "atualizado_em": 0.0, "revalidando": False, "rejeitados": [],
+        "versao": 0, "derivados": {}, "revisao_fonte": None, "revisao_propria": None, "invalido": False,
+    }
+
+
+def _publicar(e, df):
+    # Todo DataFrame novo ganha uma versão; estruturas derivadas da anterior são descartadas.
+    # O DataFrame publicado nunca é alterado no lugar (é compartilhado entre sessões).
+    e["derivados"] = {}
+    e["versao"] += 1
+    e["df"] = df
+
+
+def _hash(valores):
+    return hashlib.sha1("\n".join(valores).encode("utf-8")).hexdigest()
+
+
+def _montar(cabecalho, linhas, primeira):
+    # primeira = número (1-based) da linha da planilha correspondente a linhas[0]
+    largura = len(cabecalho)
+    linhas = [(r + [""] * largura)[:largura] for r in linhas]
+    return interpretar(pd.DataFrame(linhas, columns=cabecalho, index=range(primeira, primeira + len(linhas))))
+
+
+def _recarregar(e):
+    vals = obter_armazenamento().carregar()
+    agora = time.time()
+    e.update(linhas=len(vals), checado_em=agora, recarregado_em=agora, sujo=False)
+    if len(vals) <= 1:
+        _publicar(e, pd.DataFrame())
+        e.update(cabecalho=vals[0] if vals else None, carimbos=[r[0] for r in vals], rejeitados=[])
+        return
+    df, rejeitados = _montar(vals[0], vals[1:], 2)
+    _publicar(e, df)
+    e.update(cabecalho=vals[0], carimbos=[r[0] for r in vals], rejeitados=rejeitados)
+
+
+def _revisao_fonte():
+    try:
+        return obter_armazenamento().revisao()
+    except Exception:
+        return None
+
+
+def _carimbos_intactos(e):
+    coluna = obter_armazenamento().chaves()
+    n = e["linhas"]
+    e["checado_em"] = time.time()
+    return len(coluna) >= n and _hash(coluna[:n]) == _hash(e["carimbos"])
+
+
+def _mesclar(df, novo, numeros):
+    # Substitui/acrescenta por nº de linha da planilha: reaplicar as mesmas linhas é inofensivo
+    base = df.drop(index=df.index.intersection(numeros)) if not df.empty else df
+    if novo.empty: return base
+    return novo if base.empty else aplicar_esquema(pd.concat([base, novo]))
+
+
+def _mesclar_rejeitados(e, numeros, rejeitados):
+    numeros = set(numeros)
+    e["rejeitados"] = [r for r in e["rejeitados"] if r["Linha"] not in numeros] + rejeitados
+
+
+def _anexar_cauda(e):
+    # Devolve quantas linhas novas foram lidas
+    novas = obter_armazenamento().ler_a_partir(e["linhas"])
+    if not novas: return 0
+    inicio = e["linhas"] + 1
+    numeros = range(inicio, inicio + len(novas))
+    e["carimbos"] = e["carimbos"] + [(r[0] if r else "") for r in novas]
+    e["linhas"] += len(novas)
+    cauda, rejeitados = _montar(e["cabecalho"], [list(r) for r in novas], inicio)
+    _mesclar_rejeitados(e, numeros, rejeitados)
+    df = _mesclar(e["df"], cauda, numeros)
+    if df is not e["df"]: _publicar(e, df)
+    return len(novas)
+
+
+def _revisao(e):
+    return f"{e['linhas']}:{_hash(e['carimbos'])}"
+
+
+def _salvar_snapshot(e):
+    try:
+        os.makedirs(PASTA_CACHE, exist_ok=True)
+        tabela = pa.Table.from_pandas(e["df"], preserve_index=True)
+        meta = {"versao_esquema": VERSAO_ESQUEMA, "revisao": _revisao(e), "cabecalho": e["cabecalho"],
+                "linhas": e["linhas"], "carimbos": e["carimbos"], "recarregado_em": e["recarregado_em"],
+                "atualizado_em": e["atualizado_em"], "rejeitados": e["rejeitados"],
+                "revisao_fonte": e["revisao_fonte"]}
+        tabela = tabela.replace_schema_metadata({**(tabela.schema.metadata or {}), b"pet": json.dumps(meta).encode("utf-8")})
+        temporario = f"{ARQUIVO_SNAPSHOT}.{os.getpid()}.tmp"
+        feather.write_feather(tabela, temporario, compression="uncompressed")
+        os.replace(temporario, ARQUIVO_SNAPSHOT)
+    except Exception as erro:
+        e["erro"] = erro
+
+
+def _restaurar_snapshot(e, minimo=None, revisao_fonte=None):
+    # minimo: só aceita um snapshot sincronizado a partir desse instante;
+    # revisao_fonte: só aceita um snapshot sincronizado nessa revisão da fonte
+    if not os.path.exists(ARQUIVO_SNAPSHOT): return False
+    try:
+        tabela = feather.read_table(ARQUIVO_SNAPSHOT, memory_map=True)
+        meta = json.loads(tabela.schema.metadata[b"pet"])
+        # Só serve o snapshot se o formato for o atual e o conteúdo bater com a revisão declarada
+        if meta["versao_esquema"] != VERSAO_ESQUEMA: return False
+        if _revisao({"linhas": meta["linhas"], "carimbos": meta["carimbos"]}) != meta["revisao"]: return False
+        if minimo is not None and meta["atualizado_em"] < minimo: return False
+        if revisao_fonte is not None and meta.get("revisao_fonte") != revisao_fonte: return False
+        _publicar(e, tabela.to_pandas())
+        e.update(cabecalho=meta["cabecalho"], linhas=meta["linhas"],
+                 carimbos=meta["carimbos"], recarregado_em=meta["recarregado_em"], checado_em=0.0,
+                 atualizado_em=meta["atualizado_em"], rejeitados=meta["rejeitados"],
+                 revisao_fonte=meta.get("revisao_fonte"))
+        return True
+    except Exception:
+        return False
+
+
+@contextmanager
+def _trava_entre_processos():
+    if fcntl is None or not TRAVA_ENTRE_PROCESSOS:
+        yield; return
+    os.makedirs(PASTA_CACHE, exist_ok=True)
+    with open(ARQUIVO_TRAVA, "a") as arquivo:
+        obtida, limite = False, time.time() + ESPERA_TRAVA
+        while True:
+            try:
+                fcntl.flock(arquivo, fcntl.LOCK_EX | fcntl.LOCK_NB); obtida = True; break
+            except BlockingIOError:
+                if time.time() > limite: break
+                time.sleep(0.1)
+        try:
+            yield
+        finally:
+            if obtida: fcntl.flock(arquivo, fcntl.LOCK_UN)
+
+
+def _revalidar():
+    e = _estado()
+    try:
+        sincronizar(minimo=time.time())
+    except Exception as erro:
+        e["erro"] = erro
+    finally:
+        e["revalidando"] = False
+
+
+def _revalidar_em_segundo_plano(e):
+    with e["lock_revalidacao"]:
+        if e["revalidando"]: return
+        e["revalidando"] = True
+    threading.Thread(target=_revalidar, daemon=True).start()
+
+
+def invalidar(edicao=False):
+    # Após uma escrita: a próxima leitura sincroniza antes de responder.
+    # Uma edição não muda a coluna de carimbos, então força recarga completa.
+    # atualizado_em fica intacto: a idade exibida continua sendo a da última sincronização.
+    e = _estado()
+    e["invalido"] = True
+    if edicao: e["sujo"] = True
+
+
+def idade_dados():
+    e = _estado()
+    return None if e["df"] is None else time.time() - e["atualizado_em"]
+
+
+def rejeitados():
+    # Linhas da planilha descartadas na carga (data ilegível), para o painel do admin
+    return list(_estado()["rejeitados"])
+
+
+def revalidando():
+    return _estado()["revalidando"]
+
+
+def sincronizar(minimo=None):
+    e = _estado()
+    with e["lock"]:
+        if minimo is not None and e["df"] is not None and not e["invalido"] and e["atualizado_em"] >= minimo:
+            # Outra thread acabou de sincronizar enquanto esperávamos o lock
+            return e["df"]
+        if e["df"] is None and _restaurar_snapshot(e):
+            # Partida a quente: serve o snapshot e reconcilia com a planilha em segundo plano
+            _revalidar_em_segundo_plano(e)
+            return e["df"]
+        with _trava_entre_processos():
+            if minimo is not None and _restaurar_snapshot(e, minimo):
+                # Outro processo sincronizou enquanto esperávamos a trava: reaproveita o resultado
+                e["invalido"] = False
+                return e["df"]
+            linhas_antes, df_antes = e["linhas"], e["df"]
+            agora = time.time()
+            # Lida antes do download: uma escrita durante a leitura muda a revisão e é vista na próxima
+            revisao = _revisao_fonte()
+            mudou = revisao is not None and revisao != e["revisao_fonte"]
+            if mudou and not e["sujo"] and _restaurar_snapshot(e, revisao_fonte=revisao):
+                # Outro processo já baixou esta revisão da fonte (a qualquer momento): adota o snapshot dele
+                e.update(erro=None, atualizado_em=time.time(), revisao_propria=None, invalido=False)
+                return e["df"]
+            periodica = agora - e["recarregado_em"] > INTERVALO_RECARGA_COMPLETA
+            if revisao is not None and not mudou and e["df"] is not None and not e["sujo"] and not periodica:
+                # Fonte inalterada desde a última leitura: nada a baixar
+                e.update(checado_em=agora, erro=None, atualizado_em=agora, invalido=False)
+                return e["df"]
+            if e["df"] is None or e["cabecalho"] is None or e["sujo"] or periodica:
+                _recarregar(e)
+            elif agora - e["checado_em"] > INTERVALO_CHECAGEM and not _carimbos_intactos(e):
+                # Linha inserida no meio ou excluída
+                _recarregar(e)
+            elif mudou and revisao != e["revisao_propria"]:
+                # Mudança que não é a última escrita deste processo: pode ser edição no lugar (outro
+                # worker ou direto na planilha), que a coluna de carimbos não revela
+                _recarregar(e)
+            else:
+                _anexar_cauda(e)
+            e["erro"] = None
+            e["atualizado_em"] = time.time()
+            e["revisao_fonte"] = revisao
+            e["revisao_propria"] = None
+            e["invalido"] = False
+            if e["linhas"] != linhas_antes or e["df"] is not df_antes:
+                _salvar_snapshot(e)
+            return e["df"]
+
+
+def obter_dados():
+    e = _estado()
+    inicio = time.time()
+    idade = inicio - e["atualizado_em"]
+    if e["df"] is None or e["invalido"] or (idade > MAX_DEFASAGEM and not e["revalidando"]):
+        try:
+            return sincronizar(minimo=inicio)
+        except Exception as erro:
+            # Sem conexão com a planilha: melhor servir dados antigos do que nenhum
+            if e["df"] is None: raise
+            e["erro"] = erro
+            return e["df"]
+    if idade > TTL_DADOS:
+        _revalidar_em_segundo_plano(e)
+    return e["df"]
+
+
+# ==========================================
+# ESCRITA DIRETA NO CACHE (WRITE-THROUGH)
+# ==========================================
+# Depois de um append/update confirmado, a linha é aplicada ao DataFrame em memória
+# (nova versão) em vez de descartar o cache; a sincronização normal continua no horário.
+# A revisão da fonte lida logo após a escrita é guardada: se a próxima sincronização encontrar
+# exatamente essa revisão, a mudança foi nossa; qualquer escrita posterior força recarga.
+def registrar_insercao(linhas, primeira):
+    e = _estado()
+    revisao = _revisao_fonte()
+    with e["lock"]:
+        e["revisao_propria"] = revisao
+        if primeira is None or e["df"] is None or e["cabecalho"] is None:
+            invalidar(); return
+        numeros = range(primeira, primeira + len(linhas))
+        novo, rejeitados = _montar(e["cabecalho"], [list(l) for l in linhas], primeira)
+        antigo, indice = e["df"], e["derivados"].get("indice_nomes")
+        df = _mesclar(antigo, novo, numeros)
+        _publicar(e, df)
+        if indice is not None and not antigo.index.isin(numeros).any() and len(df) == len(antigo) + len(novo):
+            # Linhas novas entram no fim: o índice de nomes é estendido em vez de refeito
+            e["derivados"]["indice_nomes"] = _estender_indice_nomes(indice, novo, len(antigo))
+        if primeira == e["linhas"] + 1:
+            # Contíguas ao que já foi lido: avançam o ponteiro da sincronização incremental
+            e["linhas"] += len(linhas)
+            e["carimbos"] = e["carimbos"] + [str(l[0]) for l in linhas]
+        _mesclar_rejeitados(e, numeros, rejeitados)
+        _salvar_snapshot(e)
+
+
+def registrar_edicao(numero, linha):
+    e = _estado()
+    revisao = _revisao_fonte()
+    with e["lock"]:
+        e["revisao_propria"] = revisao
+        if numero is None or e["df"] is None or e["cabecalho"] is None:
+            invalidar(edicao=True); return
+        novo, rejeitados = _montar(e["cabecalho"], [list(linha)], numero)
+        antigo, indice = e["df"], e["derivados"].get("indice_nomes")
+        if numero in antigo.index and not novo.empty:
+            # Mesma posição e mesmo Nome: o índice de nomes continua válido
+            pos = antigo.index.get_loc(numero)
+            _publicar(e, aplicar_esquema(pd.concat([antigo.iloc[:pos], novo, antigo.iloc[pos + 1:]])))
+            if indice is not None and str(antigo.at[numero, 'Nome']) == str(novo['Nome'].iloc[0]):
+                e["derivados"]["indice_nomes"] = indice
+        else:
+            _publicar(e, _mesclar(antigo, novo, [numero]))
+        _mesclar_rejeitados(e, [numero], rejeitados)
+        _salvar_snapshot(e)
+
+
+# ==========================================
+# ESTRUTURAS DERIVADAS (UMA VEZ POR VERSÃO)
+# ==========================================
+def versao_dados():
+    return _estado()["versao"]
+
+
+def derivado(df, nome, construir):
+    # Memoiza construir(df) enquanto df for a versão publicada; para um df antigo
+    # (outra thread acabou de publicar) apenas calcula, sem guardar.
+    e = _estado()
+    cache = e["derivados"]
+    if e["df"] is not df: return construir(df)
+    if nome not in cache: cache[nome] = construir(df)
+    return cache[nome]
+
+
+def _chave_conteudo(df):
+    # Igual em todos os processos que têm os mesmos dados (ao contrário de `versao`, que é local)
+    if df.empty: return "vazio"
+    return hashlib.sha1(pd.util.hash_pandas_object(df, index=True).to_numpy().tobytes()).hexdigest()
+
+
+def chave_dados(df):
+    # Versão dos dados para chaves do cache compartilhado (cache_compartilhado.py)
+    return derivado(df, "chave_conteudo", _chave_conteudo)
+
+
+def _indice_nomes(df):
+    chaves = df['Nome'].astype(str).str.strip().str.lower()
+    return chaves.groupby(chaves.to_numpy()).indices
+
+
+def posicoes_do_monitor(df, nome):
+    # Histórico de um monitor em O(k): posições pré-agrupadas por nome normalizado
+    if df.empty or 'Nome' not in df.columns: return np.empty(0, dtype=np.intp)
+    posicoes = derivado(df, "indice_nomes", _indice_nomes).get(str(nome).strip().lower())
+    return posicoes if posicoes is not None else np.empty(0, dtype=np.intp)
+
+
+# Filtro de período por busca binária: chaves inteiras de dia (dias desde 1970) e a
+# permutação que ordena as linhas por data, uma vez por versão. O DataFrame continua
+# indexado pelo nº da linha da planilha (escrita direta e edições dependem disso).
+def _dias(df):
+    dias = df['Data da atividade'].to_numpy(dtype='datetime64[D]').astype(np.int64)
+    ordem = np.argsort(dias, kind='stable')
+    return {"dias": dias, "ordem": ordem, "ordenados": dias[ordem]}
+
+
+def chave_dia(d):
+    return int(np.datetime64(d, 'D').astype(np.int64))
+
+
+def posicoes_periodo(df, inicio, fim, posicoes=None):
+    # Posições (iloc) com inicio <= data <= fim, em ordem crescente de data.
+    # Sem `posicoes`: O(log N + saída). Com `posicoes` (ex.: as de um monitor): só essas são testadas.
+    if df.empty or 'Data da atividade' not in df.columns: return np.empty(0, dtype=np.intp)
+    idx = derivado(df, "dias", _dias)
+    lo, hi = chave_dia(inicio), chave_dia(fim)
+    if posicoes is None:
+        a = np.searchsorted(idx["ordenados"], lo, side="left")
+        b = np.searchsorted(idx["ordenados"], hi, side="right")
+        return idx["ordem"][a:b]
+    dias = idx["dias"][posicoes]
+    dentro = np.asarray(posicoes)[(dias >= lo) & (dias <= hi)]
+    return dentro[np.argsort(idx["dias"][dentro], kind='stable')]
+
+
+def posicoes_das_linhas(df, linhas):
+    # Nºs de linha da fonte (ex.: resultado de Armazenamento.consultar) -> posições (iloc) em
+    # ordem crescente de data; linhas que ainda não estão nesta versão do DataFrame ficam de fora
+    if df.empty or not len(linhas): return np.empty(0, dtype=np.intp)
+    posicoes = df.index.get_indexer(linhas)
+    posicoes = posicoes[posicoes >= 0]
+    return posicoes[np.argsort(derivado(df, "dias", _dias)["dias"][posicoes], kind='stable')]
+
+
+def _estender_indice_nomes(indice, novo, deslocamento):
+    estendido = dict(indice)
+    for chave, pos in _indice_nomes(novo).items():
+        pos = pos + deslocamento
+        estendido[chave] = np.concatenate([estendido[chave], pos]) if chave in estendido else pos
+    return estendido
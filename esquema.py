@@ -0,0 +1,94 @@
+import pandas as pd
+
+# ==========================================
+# ESQUEMA TIPADO DO DATAFRAME DE ATIVIDADES
+# ==========================================
+# Colunas repetitivas viram `category` (um código inteiro por linha em vez de milhares
+# de strings iguais), textos longos ficam em strings Arrow (buffers contíguos fora do
+# heap de objetos Python) e a data é convertida uma única vez, na carga.
+CATEGORICAS = [
+    "Nome", "Status", "tutores presentes", "Nome do preceptor", "Status do preceptor",
+    "Local Específico:", "Horário de Início", "Orientadora de serv", "Função",
+]
+TEXTOS = [
+    "Carimbo de data/hora", "ATIVIDADE(S) REALIZADA(S)", "OBJETIVO DA(S) ATIVIDADE(S)",
+    "RELATO FUNDAMENTADO", "REFLEXÕES CRÍTICAS",
+]
+TIPO_TEXTO = "string[pyarrow]"
+
+
+# ==========================================
+# INTERPRETAÇÃO DE DATAS E HORÁRIOS
+# ==========================================
+# Caminho rápido com formato fixo (sem inferência) para a coluna inteira; só as linhas
+# que falham passam pelos formatos alternativos. Linhas cuja data continua ilegível
+# são descartadas do DataFrame, mas devolvidas em `rejeitados` para o painel do admin.
+FORMATO_DATA = "%d/%m/%Y"
+FORMATO_HORA = "%H:%M"
+FORMATOS_DATA_ALTERNATIVOS = ["%Y-%m-%d", "%d-%m-%Y", "%d/%m/%y", "%d/%m/%Y %H:%M:%S"]
+
+
+def _datas(coluna):
+    bruto = coluna.astype(str).str.strip()
+    datas = pd.to_datetime(bruto, format=FORMATO_DATA, errors="coerce")
+    falhas = datas.isna() & (bruto != "")
+    for formato in FORMATOS_DATA_ALTERNATIVOS:
+        if not falhas.any(): break
+        datas.loc[falhas] = pd.to_datetime(bruto[falhas], format=formato, errors="coerce")
+        falhas = datas.isna() & (bruto != "")
+    if falhas.any():
+        # Último recurso: inferência elemento a elemento, dia primeiro
+        datas.loc[falhas] = pd.to_datetime(bruto[falhas], format="mixed", dayfirst=True, errors="coerce")
+    return datas
+
+
+def _horarios(coluna):
+    bruto = coluna.astype(str).str.strip()
+    horas = pd.to_datetime(bruto, format=FORMATO_HORA, errors="coerce")
+    falhas = horas.isna() & (bruto != "")
+    if falhas.any():
+        # "08:00:00", "8h00 - 12h" etc.: extrai o primeiro HH:MM só dessas linhas
+        extraidos = bruto[falhas].str.extract(r"(\d{1,2}:\d{2})")[0]
+        horas.loc[falhas] = pd.to_datetime(extraidos, format=FORMATO_HORA, errors="coerce")
+    return horas.dt.strftime(FORMATO_HORA)
+
+
+def data_iso(texto):
+    # Mesma leitura da carga para um valor isolado (cópia indexável da data no SQLite); None se ilegível
+    d = _datas(pd.Series([texto], dtype=object)).iloc[0]
+    return None if pd.isna(d) else d.date().isoformat()
+
+
+def interpretar(dados):
+    # Devolve (DataFrame tipado, lista de linhas rejeitadas com o motivo)
+    dados.columns = dados.columns.str.strip()
+    rejeitados = []
+    if 'Data da atividade' in dados.columns:
+        bruto = dados['Data da atividade']
+        datas = _datas(bruto)
+        sem_data = datas.isna()
+        if sem_data.any():
+            candidatas = dados.loc[sem_data]
+            # Linhas totalmente vazias (lacunas na planilha) não contam como rejeição
+            preenchidas = candidatas[(candidatas.astype(str) != "").any(axis=1)]
+            for linha, r in preenchidas.iterrows():
+                valor = str(bruto[linha]).strip()
+                rejeitados.append({"Linha": int(linha), "Carimbo": str(r.get('Carimbo de data/hora', '')),
+                                   "Nome": str(r.get('Nome', '')), "Data informada": valor,
+                                   "Motivo": "Data da atividade ilegível" if valor else "Data da atividade vazia"})
+        dados['Data da atividade'] = datas
+    if 'Horário de Início' in dados.columns:
+        dados['Horário de Início'] = _horarios(dados['Horário de Início'])
+    return aplicar_esquema(dados.dropna(subset=['Data da atividade'])), rejeitados
+
+
+def aplicar_esquema(dados):
+    # Idempotente: também serve para refazer as categorias depois de um concat
+    convertidas = {}
+    for col in CATEGORICAS:
+        if col in dados.columns:
+            convertidas[col] = dados[col].astype("category")
+    for col in TEXTOS:
+        if col in dados.columns and dados[col].dtype != TIPO_TEXTO:
+            convertidas[col] = dados[col].fillna("").astype(TIPO_TEXTO)
+    return dados.assign(**convertidas) if convertidas else dados
@@ -0,0 +1,166 @@
+import json
+import os
+import random
+import sqlite3
+import threading
+import time
+
+import streamlit as st
+
+from armazenamento import PASTA_CACHE, obter_armazenamento
+from dados import registrar_insercao
+
+# ==========================================
+# FILA DE ENVIOS (DIÁRIO LOCAL + LOTES)
+# ==========================================
+# Cada submissão é gravada primeiro num diário SQLite local; uma thread por processo
+# agrupa as pendentes num único append_rows e reenvia com backoff exponencial + jitter
+# quando o Google devolve erro de cota ou a rede falha. Nada é descartado.
+ARQUIVO_FILA = os.path.join(PASTA_CACHE, "fila_envios.db")
+JANELA_AGRUPAMENTO = 1.0     # segundos esperando outras submissões antes de enviar o lote
+LOTE_MAXIMO = 50
+BACKOFF_BASE = 2.0
+BACKOFF_MAXIMO = 300.0
+MAX_TENTATIVAS_ERRO = 5      # erros não transitórios (ex.: 400) desistem após N tentativas
+PRAZO_REIVINDICACAO = 300    # lote "enviando" de um processo que morreu volta para a fila
+
+STATUS_ROTULOS = {"pendente": "Na fila", "enviando": "Enviando", "enviado": "Gravado", "erro": "Falhou"}
+
+
+def _conectar():
+    os.makedirs(PASTA_CACHE, exist_ok=True)
+    con = sqlite3.connect(ARQUIVO_FILA, timeout=30, isolation_level=None)
+    con.execute("PRAGMA journal_mode=WAL")
+    con.execute("""CREATE TABLE IF NOT EXISTS envios (
+        id INTEGER PRIMARY KEY AUTOINCREMENT, criado_em REAL NOT NULL, nome TEXT, carimbo TEXT,
+        linha TEXT NOT NULL, status TEXT NOT NULL DEFAULT 'pendente', tentativas INTEGER NOT NULL DEFAULT 0,
+        proxima_em REAL NOT NULL DEFAULT 0, reivindicado_em REAL, erro TEXT, linha_planilha INTEGER,
+        incerto INTEGER NOT NULL DEFAULT 0)""")
+    # incerto = 1: uma tentativa anterior pode ter gravado (timeout, 5xx, processo morto no meio do envio)
+    con.execute("CREATE INDEX IF NOT EXISTS idx_envios_status ON envios(status, proxima_em)")
+    con.execute("CREATE INDEX IF NOT EXISTS idx_envios_nome ON envios(nome)")
+    return con
+
+
+@st.cache_resource(show_spinner=False)
+def _trabalhador():
+    sinal = threading.Event()
+    threading.Thread(target=_laco, args=(sinal,), daemon=True).start()
+    return sinal
+
+
+def iniciar():
+    # Garante a thread de envio neste processo (também drena o que sobrou de uma execução anterior)
+    _trabalhador().set()
+
+
+def enfileirar(linha):
+    con = _conectar()
+    try:
+        con.execute("INSERT INTO envios (criado_em, nome, carimbo, linha) VALUES (?, ?, ?, ?)",
+                    (time.time(), linha[1], linha[0], json.dumps(linha, ensure_ascii=False)))
+    finally:
+        con.close()
+    _trabalhador().set()
+
+
+def listar_envios(nome, incluir_enviados=False):
+    con = _conectar()
+    try:
+        filtro = "" if incluir_enviados else " AND status != 'enviado'"
+        cur = con.execute(f"SELECT id, criado_em, carimbo, linha, status, tentativas, erro FROM envios WHERE nome = ?{filtro} ORDER BY id DESC", (nome,))
+        return [{"id": i, "criado_em": c, "carimbo": ca, "linha": json.loads(l), "status": s, "tentativas": t, "erro": e}
+                for i, c, ca, l, s, t, e in cur.fetchall()]
+    finally:
+        con.close()
+
+
+def reenviar(id_envio, nome):
+    # Devolve à fila um envio que desistiu (status 'erro'); o campo incerto é mantido
+    con = _conectar()
+    try:
+        con.execute("UPDATE envios SET status='pendente', tentativas=0, proxima_em=0, erro=NULL WHERE id=? AND nome=? AND status='erro'",
+                    (id_envio, nome))
+    finally:
+        con.close()
+    _trabalhador().set()
+
+
+def _reivindicar(con):
+    agora = time.time()
+    con.execute("BEGIN IMMEDIATE")
+    try:
+        # O append_rows pode ter chegado à planilha antes de o processo morrer (ou travar sem timeout)
+        con.execute("UPDATE envios SET status='pendente', incerto=1 WHERE status='enviando' AND reivindicado_em < ?", (agora - PRAZO_REIVINDICACAO,))
+        lote = con.execute("SELECT id, linha, tentativas, incerto FROM envios WHERE status='pendente' AND proxima_em <= ? ORDER BY id LIMIT ?",
+                           (agora, LOTE_MAXIMO)).fetchall()
+        if lote:
+            con.executemany("UPDATE envios SET status='enviando', reivindicado_em=? WHERE id=?", [(agora, i) for i, _, _, _ in lote])
+        con.execute("COMMIT")
+        return lote
+    except Exception:
+        con.execute("ROLLBACK"); raise
+
+
+def _adiamento(tentativas):
+    # Backoff exponencial com "full jitter"
+    return random.uniform(0, min(BACKOFF_MAXIMO, BACKOFF_BASE * (2 ** tentativas)))
+
+
+def _ja_gravadas(con, arm, lote):
+    # Envios cuja tentativa anterior pode ter chegado à planilha: procura (carimbo, nome) antes de
+    # reenviar, marca os encontrados como gravados e devolve só o que ainda falta
+    faltam = []
+    for item in lote:
+        i, l, _, incerto = item
+        linha = json.loads(l)
+        numero = arm.localizar(linha[0], linha[1]) if incerto else None
+        if numero is None: faltam.append(item)
+        else: con.execute("UPDATE envios SET status='enviado', linha_planilha=?, erro=NULL, incerto=0 WHERE id=?", (numero, i))
+    return faltam
+
+
+def _enviar_lote(con, lote):
+    arm = obter_armazenamento()
+    try:
+        lote = _ja_gravadas(con, arm, lote)
+        if not lote: return
+        linhas = [json.loads(l) for _, l, _, _ in lote]
+        primeira = arm.anexar(linhas)
+    except Exception as erro:
+        agora = time.time()
+        incerto = int(arm.escrita_incerta(erro))
+        for i, _, tentativas, _ in lote:
+            desistir = not arm.erro_transitorio(erro) and tentativas + 1 >= MAX_TENTATIVAS_ERRO
+            con.execute("UPDATE envios SET status=?, tentativas=?, proxima_em=?, erro=?, incerto=MAX(incerto, ?) WHERE id=? AND status='enviando'",
+                        ("erro" if desistir else "pendente", tentativas + 1, agora + _adiamento(tentativas), str(erro)[:500], incerto, i))
+        return
+    for n, (i, _, _, _) in enumerate(lote):
+        numero = primeira + n if primeira is not None else None
+        con.execute("UPDATE envios SET status='enviado', linha_planilha=?, erro=NULL, incerto=0 WHERE id=?", (numero, i))
+    registrar_insercao(linhas, primeira)
+
+
+def _proximo_prazo(con):
+    prox = con.execute("SELECT MIN(proxima_em) FROM envios WHERE status='pendente'").fetchone()[0]
+    return None if prox is None else max(0.0, prox - time.time())
+
+
+def _laco(sinal):
+    while True:
+        try:
+            con = _conectar()
+            try:
+                # Pequena janela para agrupar rajadas de submissões num único lote
+                time.sleep(JANELA_AGRUPAMENTO)
+                while True:
+                    lote = _reivindicar(con)
+                    if not lote: break
+                    _enviar_lote(con, lote)
+                espera = _proximo_prazo(con)
+            finally:
+                con.close()
+        except Exception:
+            espera = BACKOFF_BASE
+        sinal.wait(timeout=espera)
+        sinal.clear()
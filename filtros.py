@@ -0,0 +1,58 @@
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from armazenamento import obter_armazenamento
+from dados import derivado, posicoes_das_linhas, posicoes_periodo
+
+# ==========================================
+# MOTOR DE FILTROS DA BARRA LATERAL (ADMIN)
+# ==========================================
+# As seleções viram um único vetor de posições: o período sai da busca binária e
+# monitores/preceptores são testados pelos códigos das categorias, só nessas posições.
+# Com o motor SQLite, período e monitores saem da consulta indexada (data_iso, Nome).
+# Nenhum DataFrame intermediário é criado; o resultado é memoizado por
+# (versão dos dados, filtros) e o chamador faz um único df.iloc no final.
+MAX_FILTROS_MEMORIZADOS = 32
+
+_lock = threading.Lock()
+
+
+def _codigos(coluna):
+    return lambda df: df[coluna].cat.codes.to_numpy()
+
+
+def _restringir(df, posicoes, coluna, valores):
+    if not valores or coluna not in df.columns or not len(posicoes): return posicoes
+    categorias = df[coluna].cat.categories
+    permitido = np.zeros(len(categorias) + 1, dtype=bool)   # última casa: código -1 (vazio)
+    permitido[categorias.get_indexer([v for v in valores if v in categorias])] = True
+    codigos = derivado(df, f"codigos:{coluna}", _codigos(coluna))
+    return posicoes[permitido[codigos[posicoes]]]
+
+
+def _calcular(df, nomes, preceptores, inicio, fim):
+    linhas = obter_armazenamento().consultar(inicio, fim, list(nomes) if nomes else None)
+    if linhas is None:
+        posicoes = posicoes_periodo(df, inicio, fim)
+        posicoes = _restringir(df, posicoes, 'Nome', nomes)
+    else:
+        posicoes = posicoes_das_linhas(df, linhas)
+    return _restringir(df, posicoes, 'Nome do preceptor', preceptores)
+
+
+def posicoes_filtradas(df, nomes, preceptores, inicio, fim):
+    # Posições (iloc) em ordem crescente de data
+    if df.empty: return np.empty(0, dtype=np.intp)
+    memo = derivado(df, "filtros", lambda _: OrderedDict())
+    chave = (tuple(nomes or ()), tuple(preceptores or ()), inicio, fim)
+    with _lock:
+        if chave in memo:
+            memo.move_to_end(chave)
+            return memo[chave]
+    posicoes = _calcular(df, nomes, preceptores, inicio, fim)
+    with _lock:
+        memo[chave] = posicoes
+        while len(memo) > MAX_FILTROS_MEMORIZADOS: memo.popitem(last=False)
+    return posicoes
@@ -0,0 +1,180 @@
+import hashlib
+import os
+import re
+import threading
+from datetime import date
+
+import pandas as pd
+from fpdf import FPDF
+
+# ==========================================
+# FOLHA DE FREQUÊNCIA (DESENHO DO PDF)
+# ==========================================
+# Só fpdf, pandas e (opcionalmente) Pillow; os dados de entrada e a montagem do
+# documento ficam em relatorio_pdf.
+_TABELA_TEXTO = str.maketrans({'\u2013':'-','\u2014':'-','\u201c':'"','\u201d':'"','\u2018':"'",'\u2019':"'",'\u2022':'-','\u00e3':'a','\u00e7':'c','\u00e9':'e','\u00ea':'e','\u00f5':'o','\u00fc':'u','\u00e1':'a','\u00ed':'i','\u00f3':'o','\u00fa':'u','\u00c3':'A','\u00c7':'C','\u00e0':'a','\u00e2':'a','\u00f4':'o','\u00f2':'o'})
+
+def limpar_texto(texto):
+    if pd.isna(texto) or texto == "": return ""
+    s = str(texto).translate(_TABELA_TEXTO)
+    try: return s.encode('latin-1', 'replace').decode('latin-1')
+    except: return s
+
+def como_texto(serie):
+    # Igual a str(valor) célula a célula (vazios viram "nan"), sem laço em Python
+    return serie.astype(str).fillna("nan")
+
+def limpar_coluna(serie):
+    # limpar_texto vetorizado: uma passada de translate por coluna
+    s = como_texto(serie).str.translate(_TABELA_TEXTO)
+    return s.str.encode('latin-1', 'replace').str.decode('latin-1')
+
+# ==========================================
+# CABEÇALHO INSTITUCIONAL (MODELO POR PROCESSO)
+# ==========================================
+# Logos, títulos e filetes são desenhados uma única vez por processo num documento de
+# rascunho; os operadores resultantes (e os logos já decodificados) ficam guardados e são
+# carimbados em cada folha. Cada logo entra no documento uma vez só e é referenciado por
+# todas as páginas.
+_RE_FONTE = re.compile(r"^BT /F(\d+) ", re.M)
+_RE_IMAGEM = re.compile(r" cm /I(\d+) Do Q$", re.M)
+_modelo = {"cabecalho": None, "lock": threading.Lock()}
+
+# Logos preparados para impressão: reduzidos a DPI_LOGOS no tamanho em que são desenhados e
+# achatados sobre o branco do papel (sem canal alfa, que o fpdf separa linha a linha em Python).
+# Ficam em cache na pasta informada por quem chama, por hash do arquivo original; sem pasta ou
+# sem Pillow, usa o original.
+DPI_LOGOS = 300
+
+def _logo(caminho, altura_mm, pasta):
+    if pasta is None: return caminho
+    try:
+        from PIL import Image
+    except ImportError:
+        return caminho
+    try:
+        with open(caminho, "rb") as f: digest = hashlib.sha1(f.read()).hexdigest()[:16]
+        base = os.path.splitext(os.path.basename(caminho))[0]
+        destino = os.path.join(pasta, f"{base}-{digest}-{altura_mm}mm-{DPI_LOGOS}dpi.png")
+        if os.path.exists(destino): return destino
+        with Image.open(caminho) as original:
+            img = original.convert("RGBA")
+        altura_px = round(altura_mm / 25.4 * DPI_LOGOS)
+        if img.height > altura_px:
+            img = img.resize((max(1, round(img.width * altura_px / img.height)), altura_px), Image.LANCZOS)
+        fundo = Image.new("RGB", img.size, (255, 255, 255))
+        fundo.paste(img, mask=img.getchannel("A"))
+        os.makedirs(pasta, exist_ok=True)
+        temporario = f"{destino}.{os.getpid()}.tmp"
+        fundo.save(temporario, format="PNG", optimize=True)
+        os.replace(temporario, destino)
+        return destino
+    except Exception:
+        return caminho
+
+def _desenhar_cabecalho(pdf, pasta_logos):
+    y_l = [12,12,10,14,12]; h_l = [18,18,22,14,18]; px = [18, 45, 68, 134, 175]
+    imgs = ["ufpi.png", "sus.png", "banner-pet.png", "fms.png", "caps.png"]
+    for x, img, h, y in zip(px, imgs, h_l, y_l):
+        if os.path.exists(img):
+            try: pdf.image(_logo(img, h, pasta_logos), x=x, y=y, h=h)
+            except: pass
+                
+    pdf.set_y(30); pdf.set_line_width(0.4)
+    pdf.line(pdf.l_margin, pdf.get_y(), pdf.w - pdf.r_margin, pdf.get_y())
+    pdf.ln(4)
+
+    pdf.set_font("Helvetica", 'B', 10)
+    pdf.cell(0, 6, limpar_texto("UNIVERSIDADE FEDERAL DO PIAUI - UFPI"), ln=True, align='C')
+    pdf.set_font("Helvetica", '', 8)
+    pdf.cell(0, 5, limpar_texto("PROJETO PET SAUDE / I&SD - INFORMACAO E SAUDE DIGITAL"), ln=True, align='C')
+    pdf.ln(2); pdf.line(pdf.l_margin, pdf.get_y(), pdf.w - pdf.r_margin, pdf.get_y())
+    pdf.ln(3); pdf.set_font("Helvetica", 'B', 11)
+    pdf.cell(0, 7, limpar_texto("FOLHA DE FREQUENCIA"), ln=True, align='C')
+
+def _modelo_cabecalho(pasta_logos):
+    with _modelo["lock"]:
+        if _modelo["cabecalho"] is None:
+            pdf = novo_pdf(); pdf.add_page()
+            # Preenchimento diferente do texto: o fpdf grava a cor preta junto de cada texto,
+            # e o modelo não depende da cor de preenchimento da página onde for carimbado
+            pdf.set_text_color(0, 0, 0); pdf.set_fill_color(255, 255, 255)
+            inicio = len(pdf.pages[1])
+            _desenhar_cabecalho(pdf, pasta_logos)
+            _modelo["cabecalho"] = {"operadores": pdf.pages[1][inicio:].rstrip("\n"), "y": pdf.get_y(), "linha": pdf.line_width,
+                                    "fontes": pdf.fonts, "imagens": {k: dict(v) for k, v in pdf.images.items()}, "versao": pdf.pdf_version}
+        return _modelo["cabecalho"]
+
+def _registrar_recursos(pdf, fontes, imagens, versao):
+    # Registra fontes/imagens de outro documento neste e devolve os mapas de renumeração (i antigo -> i novo)
+    pdf.pdf_version = max(pdf.pdf_version, versao)   # PNG com transparência exige PDF 1.4
+    mapa_fontes, mapa_imagens = {}, {}
+    for chave, fonte in fontes.items():
+        if chave not in pdf.fonts: pdf.fonts[chave] = dict(fonte, i=len(pdf.fonts) + 1)
+        mapa_fontes[fonte['i']] = pdf.fonts[chave]['i']
+    for chave, imagem in imagens.items():
+        # Cópia: o fpdf descarta os dados da imagem do próprio dicionário ao gerar a saída
+        if chave not in pdf.images: pdf.images[chave] = dict(imagem, i=len(pdf.images) + 1)
+        mapa_imagens[imagem['i']] = pdf.images[chave]['i']
+    return mapa_fontes, mapa_imagens
+
+def _renumerar(operadores, mapa_fontes, mapa_imagens):
+    operadores = _RE_FONTE.sub(lambda m: f"BT /F{mapa_fontes[int(m.group(1))]} ", operadores)
+    return _RE_IMAGEM.sub(lambda m: f" cm /I{mapa_imagens[int(m.group(1))]} Do Q", operadores)
+
+def _carimbar_cabecalho(pdf, pasta_logos):
+    m = _modelo_cabecalho(pasta_logos)
+    mapa_fontes, mapa_imagens = _registrar_recursos(pdf, m["fontes"], m["imagens"], m["versao"])
+    pdf._out(_renumerar(m["operadores"], mapa_fontes, mapa_imagens))
+    # O FPDF não acompanhou os operadores carimbados: alinha o estado ao que ficou no fluxo
+    pdf.font_family = ''   # o próximo set_font é sempre emitido
+    pdf.line_width = m["linha"]
+    pdf.set_y(m["y"])
+
+def pagina_pdf(pdf, df_m, nome, mes, ano, prec, visto=False, pasta_logos=None):
+    meses = ["Janeiro","Fevereiro","Marco","Abril","Maio","Junho","Julho","Agosto","Setembro","Outubro","Novembro","Dezembro"]
+    pdf.set_draw_color(0, 0, 0); pdf.set_text_color(0, 0, 0)
+    _carimbar_cabecalho(pdf, pasta_logos)
+    
+    pdf.ln(3); mes_idx = int(mes) - 1 if 1 <= int(mes) <= 12 else 0
+    if df_m.empty or 'Função' not in df_m.columns or pd.isna(df_m.iloc[0]['Função']):
+        fnc = "MONITOR(A)"
+    else:
+        fnc = str(df_m.iloc[0]['Função']).upper()
+    if fnc in ('NAN', '', 'MONITOR', 'MONITORA'): fnc = "MONITOR(A)"
+    
+    for lbl, val in [("MES DE REFERENCIA", f"{meses[mes_idx].upper()} / {ano}"), ("GRUPO TUTORIAL", "Grupo 1 - Letramento p/ Usuarios SUS"), ("LOCAL", "CAPS AD - Teresina / PI"), ("PRECEPTORA", prec), (fnc, nome)]:
+        pdf.set_font("Helvetica", 'B', 8); pdf.cell(44, 5, limpar_texto(f"  {lbl}:"), border=0)
+        pdf.set_font("Helvetica", '', 8);  pdf.cell(0, 5, limpar_texto(val), border=0, ln=True)
+
+    pdf.ln(4); ws = [28, 28, 28, 86]
+    pdf.set_fill_color(220, 220, 220); pdf.set_font("Helvetica", 'B', 8)
+    for h, w in zip(["Data", "Entrada", "Saida", "Atividades Desenvolvidas"], ws): pdf.cell(w, 8, limpar_texto(h), border=1, align='C', fill=True)
+    pdf.ln(); pdf.set_font("Helvetica", '', 8)
+    
+    flip = False
+    for d, ent, sai, ativ in df_m.sort_values('Data da atividade')[['Data', 'Entrada', 'Saida', 'Atividade']].itertuples(index=False, name=None):
+        if flip:
+            pdf.set_fill_color(245, 245, 245)
+        else:
+            pdf.set_fill_color(255, 255, 255)
+            
+        flip = not flip
+        y0 = pdf.get_y()
+        pdf.cell(ws[0], 5, d, border=0, align='C', fill=True)
+        pdf.cell(ws[1], 5, ent, border=0, align='C', fill=True)
+        pdf.cell(ws[2], 5, sai, border=0, align='C', fill=True)
+        pdf.multi_cell(ws[3], 5, ativ, border=1, align='L', fill=True)
+        y1 = pdf.get_y(); h_r = y1 - y0
+        pdf.rect(pdf.l_margin, y0, ws[0], h_r); pdf.rect(pdf.l_margin+ws[0], y0, ws[1], h_r); pdf.rect(pdf.l_margin+ws[0]+ws[1], y0, ws[2], h_r)
+        pdf.set_y(y1)
+        if pdf.get_y() > 255: pdf.add_page()
+
+    pdf.ln(8); pdf.set_font("Helvetica", '', 9)
+    pdf.cell(0, 5, limpar_texto(f"Assinatura do {fnc}: _________________________________________________"), ln=True)
+    if visto:
+        pdf.ln(10); pdf.cell(0, 5, limpar_texto(f"Visto do Preceptor (Consolidado): ____________________________  Data: {date.today().strftime('%d/%m/%Y')}"), ln=True)
+
+def novo_pdf():
+    pdf = FPDF(); pdf.set_auto_page_break(auto=True, margin=15)
+    return pdf
@@ -0,0 +1,161 @@
+import os
+import re
+import threading
+import time
+
+import gspread
+import requests
+import streamlit as st
+from google.oauth2.service_account import Credentials
+from streamlit.errors import StreamlitSecretNotFoundError
+
+# ==========================================
+# CONEXÃO COMPARTILHADA COM O GOOGLE SHEETS
+# ==========================================
+# Um único cliente/aba por processo: o token OAuth é renovado pela própria
+# sessão autorizada do gspread, e os metadados da planilha são buscados uma vez.
+URL_PLANILHA = "https://docs.google.com/spreadsheets/d/1PwDHHAD4ITWZoHuPpFVBE7t3kJy3Wxaw5APSVomBVOA/edit?usp=sharing"
+# drive.file só enxerga arquivos criados pelo próprio app; o modifiedTime da planilha
+# (revisao_planilha) precisa de leitura de metadados do Drive
+ESCOPOS = ["https://www.googleapis.com/auth/spreadsheets", "https://www.googleapis.com/auth/drive.file",
+           "https://www.googleapis.com/auth/drive.metadata.readonly"]
+
+INTERVALO_VERIFICACAO = 300   # segundos sem uso antes de testar a conexão novamente
+CODIGOS_RECONEXAO = (401, 500, 502, 503)
+
+
+def _credenciais():
+    try:
+        if "gcp_service_account" in st.secrets:
+            creds_dict = dict(st.secrets["gcp_service_account"])
+            creds_dict['private_key'] = creds_dict['private_key'].replace('\\n', '\n')
+            return Credentials.from_service_account_info(creds_dict, scopes=ESCOPOS)
+    except (StreamlitSecretNotFoundError, FileNotFoundError):
+        pass
+    caminho = os.path.join(os.path.dirname(os.path.abspath(__file__)), "credentials.json")
+    return Credentials.from_service_account_file(caminho, scopes=ESCOPOS)
+
+
+@st.cache_resource(show_spinner=False)
+def _conexao():
+    return {"cliente": None, "aba": None, "usada_em": 0.0, "lock": threading.Lock()}
+
+
+def _conectar(c):
+    # PET_PLANILHA_LOCAL aponta o gspread para o substituto local (planilha_local.py)
+    from planilha_local import SessaoLocal, endereco_local
+    local = endereco_local()
+    c["cliente"] = gspread.Client(auth=None, session=SessaoLocal(local)) if local else gspread.authorize(_credenciais())
+    c["aba"] = c["cliente"].open_by_url(URL_PLANILHA).sheet1
+    c["usada_em"] = time.time()
+
+
+def _saudavel(c):
+    # Chamada leve (só metadados) para conexões que ficaram ociosas
+    try:
+        c["aba"].spreadsheet.fetch_sheet_metadata({"fields": "spreadsheetId"})
+        return True
+    except Exception:
+        return False
+
+
+def obter_aba(reconectar=False):
+    c = _conexao()
+    with c["lock"]:
+        if reconectar or c["aba"] is None:
+            _conectar(c)
+        elif time.time() - c["usada_em"] > INTERVALO_VERIFICACAO and not _saudavel(c):
+            _conectar(c)
+        c["usada_em"] = time.time()
+        return c["aba"]
+
+
+def erro_transitorio(erro):
+    # Cota excedida, instabilidade do Google ou da rede: vale tentar de novo mais tarde
+    if isinstance(erro, gspread.exceptions.APIError):
+        return erro.code in (429, 500, 502, 503, 504)
+    return isinstance(erro, (requests.exceptions.ConnectionError, requests.exceptions.Timeout))
+
+
+def escrita_incerta(erro):
+    # A requisição pode ter chegado ao Google antes da falha: a escrita talvez tenha sido aplicada
+    if isinstance(erro, gspread.exceptions.APIError):
+        return erro.code in (500, 502, 503, 504)
+    return isinstance(erro, (requests.exceptions.ConnectionError, requests.exceptions.Timeout))
+
+
+def _precisa_reconectar(erro):
+    if isinstance(erro, gspread.exceptions.APIError):
+        return erro.code in CODIGOS_RECONEXAO
+    return isinstance(erro, (requests.exceptions.ConnectionError, requests.exceptions.Timeout))
+
+
+def executar(operacao, idempotente=True):
+    # Executa operacao(aba); se a conexão caiu ou o token expirou, reconecta e tenta uma vez mais.
+    # Operações não idempotentes (append) só são repetidas após 401: depois de timeout, queda de
+    # rede ou 5xx a escrita pode ter chegado à planilha, e quem chamou decide o que fazer.
+    try:
+        return operacao(obter_aba())
+    except Exception as e:
+        if not _precisa_reconectar(e): raise
+        if not idempotente and not (isinstance(e, gspread.exceptions.APIError) and e.code == 401):
+            _conexao()["usada_em"] = 0.0   # força a verificação da conexão no próximo uso
+            raise
+        return operacao(obter_aba(reconectar=True))
+
+
+def revisao_planilha():
+    # modifiedTime do arquivo no Drive (uma chamada de metadados, sem baixar células);
+    # None se a conta de serviço não puder ler os metadados do arquivo
+    try:
+        return executar(lambda aba: aba.spreadsheet.get_lastUpdateTime())
+    except gspread.exceptions.APIError as erro:
+        if erro.code in (403, 404): return None
+        raise
+
+
+# ==========================================
+# LOCALIZADOR DE LINHAS (carimbo, nome) -> nº da linha
+# ==========================================
+# Montado a partir de uma leitura estreita das colunas A:B e mantido pelas inserções;
+# antes de cada escrita a linha é conferida com uma leitura de uma única linha.
+@st.cache_resource(show_spinner=False)
+def _localizador():
+    return {"indice": None, "lock": threading.Lock()}
+
+
+def _montar_localizador(loc):
+    indice = {}
+    for i, r in enumerate(executar(lambda aba: aba.get("A:B")), start=1):
+        if len(r) >= 2: indice.setdefault((r[0], r[1]), i)
+    loc["indice"] = indice
+
+
+def linha_do_intervalo(resposta):
+    # Extrai o nº da linha de uma resposta de append ("Página1!A12:O12" -> 12)
+    intervalo = (resposta or {}).get("updates", {}).get("updatedRange", "")
+    m = re.search(r"![A-Z]+(\d+)", intervalo)
+    return int(m.group(1)) if m else None
+
+
+def registrar_linha(carimbo, nome, linha):
+    loc = _localizador()
+    with loc["lock"]:
+        if loc["indice"] is not None and linha is not None:
+            loc["indice"].setdefault((carimbo, nome), linha)
+
+
+def localizar_linha(carimbo, nome):
+    loc = _localizador()
+    with loc["lock"]:
+        recente = loc["indice"] is None
+        if recente: _montar_localizador(loc)
+        while True:
+            linha = loc["indice"].get((carimbo, nome))
+            if linha is not None:
+                atual = executar(lambda aba: aba.get(f"A{linha}:B{linha}"))
+                if atual and list(atual[0][:2]) == [carimbo, nome]:
+                    return linha
+            if recente: return None
+            # Índice desatualizado (linha inserida por outro processo ou excluída): remonta uma vez
+            _montar_localizador(loc); recente = True
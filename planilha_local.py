@@ -0,0 +1,262 @@
+import argparse
+import json
+import os
+import random
+import re
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlsplit
+
+import requests
+
+from armazenamento import CABECALHO
+
+# ==========================================
+# PLANILHA LOCAL (SUBSTITUTO DO GOOGLE SHEETS)
+# ==========================================
+# Servidor HTTP que responde ao subconjunto das APIs do Sheets v4 e do Drive v3 usado
+# pelo gspread (metadados, leitura de intervalos, append e update), com latência,
+# erros de cota e tamanho da planilha configuráveis. O app aponta para ele com
+#   PET_PLANILHA_LOCAL=http://127.0.0.1:8765   (servidor iniciado à parte)
+#   PET_PLANILHA_LOCAL=embutido                (servidor numa thread do próprio processo)
+# Uso: python planilha_local.py --porta 8765 --linhas 5000 --latencia 0.15 --erro-cota 0.05
+ID_LOCAL = "planilha-local"
+TITULO_ABA = "Respostas ao formulário 1"
+HOSTS_GOOGLE = ("https://sheets.googleapis.com", "https://www.googleapis.com")
+
+MONITORES = ["Ana Souza", "Bruno Lima", "Carla Mendes", "Diego Alves", "Elisa Rocha", "Fábio Nunes"]
+PRECEPTORES = ["Mariângela - Preceptora turno MANHÃ", "Sammia - Preceptora turno TARDE"]
+
+
+def gerar_linhas(n, semente=42):
+    aleatorio = random.Random(semente)
+    inicio = datetime(2024, 1, 1, 8, 0, 0)
+    linhas = []
+    for i in range(n):
+        quando = inicio + timedelta(hours=6 * i, seconds=i % 60)
+        linhas.append([
+            quando.strftime("%d/%m/%Y %H:%M:%S"), aleatorio.choice(MONITORES), "",
+            aleatorio.choice(["Joana Machado", "Léia Lima", "Nenhum"]), aleatorio.choice(PRECEPTORES), "",
+            quando.strftime("%d/%m/%Y"), "CAPS AD", aleatorio.choice(["08:00", "13:30", "14:00"]),
+            "Acolhimento e oficina de letramento digital " * aleatorio.randint(1, 4),
+            "Apoiar usuários no acesso aos serviços digitais do SUS.",
+            "Relato da atividade desenvolvida com os usuários. " * aleatorio.randint(2, 8),
+            "Reflexão sobre a prática.", "Beatriz Costa", "Monitor",
+        ])
+    return linhas
+
+
+def _coluna(letras):
+    n = 0
+    for c in letras: n = n * 26 + ord(c) - 64
+    return n
+
+
+def _letras(n):
+    s = ""
+    while n: n, r = divmod(n - 1, 26); s = chr(65 + r) + s
+    return s
+
+
+class PlanilhaLocal:
+    def __init__(self, linhas=0, latencia=0.0, erro_cota=0.0, semente=42):
+        self.valores = [list(CABECALHO)] + gerar_linhas(linhas, semente)
+        self.latencia = latencia
+        self.erro_cota = erro_cota
+        self.linhas_grade = max(1000, len(self.valores))
+        self.modificado_em = datetime.now(timezone.utc)
+        self.lock = threading.Lock()
+        self._aleatorio = random.Random(semente)
+
+    def _intervalo(self, a1):
+        # "'Aba'!A2:O", "A:B", "A5:B5", "'Aba'" -> (linha_ini, linha_fim, col_ini, col_fim), 1-based
+        a1 = a1.split("!", 1)[1] if "!" in a1 else ("" if a1.startswith("'") or a1 == TITULO_ABA else a1)
+        m = re.fullmatch(r"([A-Z]*)(\d*)(?::([A-Z]*)(\d*))?", a1)
+        if not m: raise ValueError(f"Intervalo inválido: {a1}")
+        c1, l1, c2, l2 = m.groups()
+        if a1 and ":" not in a1:
+            c2, l2 = c1, l1
+        return (int(l1) if l1 else 1, int(l2) if l2 else None,
+                _coluna(c1) if c1 else 1, _coluna(c2) if c2 else None)
+
+    def ler(self, a1, por_colunas=False):
+        l1, l2, c1, c2 = self._intervalo(a1)
+        if l1 > self.linhas_grade:
+            raise ErroLocal(400, f"Range ({a1}) exceeds grid limits. Max rows: {self.linhas_grade}", "INVALID_ARGUMENT")
+        fim = len(self.valores) if l2 is None else min(l2, len(self.valores))
+        bloco = [r[c1 - 1:c2] for r in self.valores[l1 - 1:fim]]
+        while bloco and not any(bloco[-1]): bloco.pop()
+        bloco = [self._aparar(r) for r in bloco]
+        if por_colunas:
+            largura = max((len(r) for r in bloco), default=0)
+            bloco = [self._aparar([r[j] if j < len(r) else "" for r in bloco]) for j in range(largura)]
+        return bloco
+
+    @staticmethod
+    def _aparar(r):
+        r = list(r)
+        while r and r[-1] == "": r.pop()
+        return r
+
+    def anexar(self, linhas):
+        primeira = len(self.valores) + 1
+        self.valores.extend([str(v) for v in r] for r in linhas)
+        self.linhas_grade = max(self.linhas_grade, len(self.valores))
+        self.modificado_em = datetime.now(timezone.utc)
+        ultima = len(self.valores)
+        largura = max((len(r) for r in linhas), default=1)
+        return f"'{TITULO_ABA}'!A{primeira}:{_letras(largura)}{ultima}"
+
+    def atualizar(self, a1, linhas):
+        l1, _, c1, _ = self._intervalo(a1)
+        for i, r in enumerate(linhas):
+            alvo = l1 + i
+            while len(self.valores) < alvo: self.valores.append([])
+            atual = self.valores[alvo - 1]
+            atual.extend([""] * (c1 - 1 + len(r) - len(atual)))
+            atual[c1 - 1:c1 - 1 + len(r)] = [str(v) for v in r]
+        self.linhas_grade = max(self.linhas_grade, len(self.valores))
+        self.modificado_em = datetime.now(timezone.utc)
+        return f"'{TITULO_ABA}'!{a1.split('!')[-1]}"
+
+    def metadados(self):
+        largura = max(len(r) for r in self.valores)
+        return {
+            "spreadsheetId": ID_LOCAL,
+            "properties": {"title": "PET Saúde (local)", "locale": "pt_BR", "timeZone": "America/Fortaleza"},
+            "sheets": [{"properties": {"sheetId": 0, "title": TITULO_ABA, "index": 0, "sheetType": "GRID",
+                                       "gridProperties": {"rowCount": self.linhas_grade, "columnCount": max(26, largura)}}}],
+        }
+
+    def drive(self):
+        return {"id": ID_LOCAL, "name": "PET Saúde (local)", "createdTime": "2024-01-01T00:00:00.000Z",
+                "modifiedTime": self.modificado_em.strftime("%Y-%m-%dT%H:%M:%S.%f")[:-3] + "Z"}
+
+    def simular_rede(self):
+        if self.latencia: time.sleep(self.latencia * self._aleatorio.uniform(0.5, 1.5))
+        if self.erro_cota and self._aleatorio.random() < self.erro_cota:
+            raise ErroLocal(429, "Quota exceeded for quota metric 'Read requests' (simulado)", "RESOURCE_EXHAUSTED")
+
+
+class ErroLocal(Exception):
+    def __init__(self, codigo, mensagem, status):
+        super().__init__(mensagem)
+        self.codigo, self.mensagem, self.status = codigo, mensagem, status
+
+
+def _tratador(planilha):
+    class Tratador(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *args): pass
+
+        def _responder(self, codigo, corpo):
+            dados = json.dumps(corpo).encode("utf-8")
+            self.send_response(codigo)
+            self.send_header("Content-Type", "application/json; charset=UTF-8")
+            self.send_header("Content-Length", str(len(dados)))
+            self.end_headers()
+            self.wfile.write(dados)
+
+        def _corpo(self):
+            n = int(self.headers.get("Content-Length") or 0)
+            return json.loads(self.rfile.read(n) or b"{}")
+
+        def _despachar(self, metodo):
+            partes = urlsplit(self.path)
+            params = {k: v[-1] for k, v in parse_qs(partes.query).items()}
+            caminho = partes.path
+            corpo = self._corpo() if metodo in ("POST", "PUT") else {}
+            try:
+                planilha.simular_rede()
+                with planilha.lock:
+                    resposta = self._rota(metodo, caminho, params, corpo)
+                self._responder(200, resposta)
+            except ErroLocal as e:
+                self._responder(e.codigo, {"error": {"code": e.codigo, "message": e.mensagem, "status": e.status}})
+            except Exception as e:
+                self._responder(400, {"error": {"code": 400, "message": str(e), "status": "INVALID_ARGUMENT"}})
+
+        def _rota(self, metodo, caminho, params, corpo):
+            if caminho.startswith("/drive/v3/files/"):
+                return planilha.drive()
+            m = re.fullmatch(r"/v4/spreadsheets/[^/]+(?:/values/(.+))?", caminho)
+            if not m: raise ErroLocal(404, f"Not found: {caminho}", "NOT_FOUND")
+            if m.group(1) is None:
+                return planilha.metadados()
+            bruto = m.group(1)
+            if metodo == "POST" and bruto.endswith(":append"):
+                intervalo = planilha.anexar(corpo.get("values", []))
+                return {"spreadsheetId": ID_LOCAL, "updates": {"spreadsheetId": ID_LOCAL, "updatedRange": intervalo,
+                                                               "updatedRows": len(corpo.get("values", []))}}
+            a1 = unquote(bruto)
+            if metodo == "PUT":
+                intervalo = planilha.atualizar(a1, corpo.get("values", []))
+                return {"spreadsheetId": ID_LOCAL, "updatedRange": intervalo, "updatedRows": len(corpo.get("values", []))}
+            por_colunas = params.get("majorDimension") == "COLUMNS"
+            return {"range": a1, "majorDimension": "COLUMNS" if por_colunas else "ROWS",
+                    "values": planilha.ler(a1, por_colunas)}
+
+        def do_GET(self): self._despachar("GET")
+        def do_POST(self): self._despachar("POST")
+        def do_PUT(self): self._despachar("PUT")
+
+    return Tratador
+
+
+def iniciar_servidor(planilha, porta=0, host="127.0.0.1"):
+    servidor = ThreadingHTTPServer((host, porta), _tratador(planilha))
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    return servidor, f"http://{host}:{servidor.server_address[1]}"
+
+
+class SessaoLocal(requests.Session):
+    # Redireciona para o servidor local as chamadas que o gspread faz ao Google
+    def __init__(self, base):
+        super().__init__()
+        self.base = base.rstrip("/")
+
+    def request(self, method, url, *args, **kwargs):
+        for host in HOSTS_GOOGLE:
+            if url.startswith(host):
+                url = self.base + url[len(host):]
+                break
+        return super().request(method, url, *args, **kwargs)
+
+
+def _servidor_embutido():
+    planilha = PlanilhaLocal(linhas=int(os.environ.get("PET_LOCAL_LINHAS", 500)),
+                             latencia=float(os.environ.get("PET_LOCAL_LATENCIA", 0)),
+                             erro_cota=float(os.environ.get("PET_LOCAL_ERRO_COTA", 0)))
+    return iniciar_servidor(planilha)[1]
+
+
+_embutido = {"url": None, "lock": threading.Lock()}
+
+
+def endereco_local():
+    # URL do substituto configurado em PET_PLANILHA_LOCAL, ou None para usar o Google
+    valor = os.environ.get("PET_PLANILHA_LOCAL", "").strip()
+    if not valor: return None
+    if valor.startswith("http"): return valor
+    with _embutido["lock"]:
+        if _embutido["url"] is None: _embutido["url"] = _servidor_embutido()
+        return _embutido["url"]
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Substituto local do Google Sheets para testes de carga e latência.")
+    ap.add_argument("--porta", type=int, default=8765)
+    ap.add_argument("--linhas", type=int, default=500, help="linhas de atividades geradas")
+    ap.add_argument("--latencia", type=float, default=0.0, help="latência média por requisição (s)")
+    ap.add_argument("--erro-cota", type=float, default=0.0, help="probabilidade de responder 429")
+    ap.add_argument("--semente", type=int, default=42)
+    a = ap.parse_args()
+    servidor, url = iniciar_servidor(PlanilhaLocal(a.linhas, a.latencia, a.erro_cota, a.semente), a.porta)
+    print(f"Planilha local em {url} ({a.linhas} linhas). Use PET_PLANILHA_LOCAL={url}")
+    try:
+        while True: time.sleep(3600)
+    except KeyboardInterrupt:
+        servidor.shutdown()
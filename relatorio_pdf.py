@@ -0,0 +1,53 @@
+import os
+
+import pandas as pd
+
+from armazenamento import PASTA_CACHE
+from dados import derivado
+from folha_pdf import como_texto, limpar_coluna, novo_pdf, pagina_pdf
+
+# ==========================================
+# GESTÃO DE PDF (ESTRITO PRETO E BRANCO)
+# ==========================================
+# O desenho das folhas fica em folha_pdf; aqui ficam os dados de entrada (memoizados por
+# versão) e a montagem do documento, um monitor após o outro.
+PASTA_LOGOS = os.path.join(PASTA_CACHE, "logos")
+
+# ==========================================
+# TABELA DE FREQUÊNCIA (TEXTOS PRÉ-CALCULADOS)
+# ==========================================
+# Data, entrada, saída e atividade já formatadas e saneadas, coluna a coluna, uma vez por
+# versão dos dados; o laço de linhas do PDF só lê as strings prontas.
+COLUNAS_PDF = ['Data da atividade', 'Função', 'Nome do preceptor', 'Data', 'Entrada', 'Saida', 'Atividade']
+
+def _montar_tabela(df):
+    t = pd.DataFrame(index=df.index)
+    for c in ['Data da atividade', 'Função', 'Nome do preceptor']:
+        if c in df.columns: t[c] = df[c]
+    t['Data'] = df['Data da atividade'].dt.strftime('%d/%m/%Y').fillna("")
+    ent = como_texto(df['Horário de Início']).str.strip() if 'Horário de Início' in df.columns else pd.Series("", index=df.index)
+    t['Entrada'] = ent
+    t['Saida'] = (pd.to_datetime(ent, format="%H:%M", errors='coerce') + pd.Timedelta(hours=4)).dt.strftime("%H:%M").fillna("")
+    ativ = df['ATIVIDADE(S) REALIZADA(S)'] if 'ATIVIDADE(S) REALIZADA(S)' in df.columns else pd.Series("", index=df.index)
+    t['Atividade'] = limpar_coluna(como_texto(ativ).str.upper())
+    return t
+
+def tabela_pdf(df):
+    return derivado(df, "pdf:tabela", _montar_tabela)
+
+def gerar_pdf(df_geral, nomes, mes, ano, posicoes=None):
+    # posicoes: recorte (iloc) de df_geral; a tabela saneada é memoizada para o df inteiro
+    tabela = tabela_pdf(df_geral)
+    if posicoes is not None: df_geral, tabela = df_geral.iloc[posicoes], tabela.iloc[posicoes]
+    grupos = df_geral.groupby('Nome', observed=True).indices if 'Nome' in df_geral.columns else {}
+    nomes_com_dados = [n for n in nomes if n in grupos]
+    colunas = [c for c in COLUNAS_PDF if c in tabela.columns]
+    pdf = novo_pdf()
+    for i, nome in enumerate(nomes_com_dados):
+        df_i = tabela.iloc[grupos[nome]][colunas]
+        prec = df_i['Nome do preceptor'].iloc[0] if 'Nome do preceptor' in df_i.columns else "___"
+        pdf.add_page()
+        # Só o último monitor recebe o "visto" do preceptor
+        pagina_pdf(pdf, df_i, nome, mes, ano, prec, visto=i == len(nomes_com_dados) - 1, pasta_logos=PASTA_LOGOS)
+    saida = pdf.output(dest='S')
+    return saida.encode('latin-1') if isinstance(saida, str) else bytes(saida)
@@ -1,14 +1,12 @@
 import streamlit as st
 import pandas as pd
-import gspread
-from google.oauth2.service_account import Credentials
 import traceback
 import locale
 from streamlit.errors import StreamlitSecretNotFoundError
 from fpdf import FPDF
 from datetime import date, datetime, timedelta
 import optparse
-import os
+from planilha import executar
 # --- CONFIGURA LOCALE ---
 try:
     locale.setlocale(locale.LC_ALL, "pt_BR.UTF-8")
@@ -35,8 +33,6 @@ st.markdown(
     unsafe_allow_html=True,
 )
 
-URL_DA_PLANILHA = "https://docs.google.com/spreadsheets/d/1PwDHHAD4ITWZoHuPpFVBE7t3kJy3Wxaw5APSVomBVOA/edit?usp=sharing"
-
 try:
     st.sidebar.image("banner-pet.png", use_container_width=True)
 except:
@@ -45,29 +41,12 @@ except:
 @st.cache_data(ttl=60)
 def carregar_dados():
     try:
-        scopes = [
-            "https://www.googleapis.com/auth/spreadsheets",
-            "https://www.googleapis.com/auth/drive.file"
-        ]
         try:
-            if "gcp_service_account" in st.secrets:
-                creds_dict = dict(st.secrets["gcp_service_account"])
-                creds_dict['private_key'] = creds_dict['private_key'].replace('\\n', '\n')
-                creds = Credentials.from_service_account_info(creds_dict, scopes=scopes)
-            else:
-                # Força o Python a olhar exatamente na mesma pasta deste script .py
-                diretorio_atual = os.path.dirname(os.path.abspath(__file__))
-                caminho_credenciais = os.path.join(diretorio_atual, "credentials.json")
-                
-                creds = Credentials.from_service_account_file(caminho_credenciais, scopes=scopes)
+            all_values = executar(lambda aba: aba.get_all_values())
         except (StreamlitSecretNotFoundError, FileNotFoundError):
             st.error("Credenciais não encontradas.")
             return pd.DataFrame()
 
-        client = gspread.authorize(creds)
-        sheet = client.open_by_url(URL_DA_PLANILHA).sheet1
-        all_values = sheet.get_all_values()
-
         if len(all_values) > 1:
             header = all_values[0]
             data = all_values[1:]